@@ -0,0 +1,457 @@
+"""
+Phân đoạn khách hàng RFM cho dữ liệu lớn (hàng triệu khách hàng).
+
+Phiên bản có thể import của quy trình trong unsupervised_learning.ipynb
+(TimSoCumToiUu, PhanCumPhanCap, PhanDoanKhachHang):
+- Đọc CSV theo khối, lưu đặc trưng ra memmap để các tiến trình con dùng chung
+- K-means dùng MiniBatchKMeans, thử nhiều K song song bằng joblib
+- Silhouette ước lượng trên mẫu ngẫu nhiên thay vì toàn bộ dữ liệu
+- Phân cụm phân cấp trên các điểm đại diện (tâm micro-cluster) thay vì từng điểm
+- Ghi kết quả theo khối ra CSV cùng định dạng ket_qua_phan_doan_khach_hang.csv
+"""
+import argparse
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from scipy.cluster.hierarchy import fcluster, linkage
+from sklearn.cluster import MiniBatchKMeans, kmeans_plusplus
+from sklearn.metrics import pairwise_distances_argmin, silhouette_score
+from sklearn.preprocessing import StandardScaler
+
+FEATURES_RFM = ['recency', 'frequency', 'monetary']
+
+
+def dat_ten_theo_rfm(recency, frequency, monetary):
+    """
+    Đặt tên cụm từ RFM trung bình (cùng ngưỡng với PhanDoanKhachHang.dat_ten_cum)
+    """
+    if recency <= 60 and frequency >= 15 and monetary >= 5000000:
+        return "Khách hàng VIP"
+    elif recency <= 90 and frequency >= 8 and monetary >= 2000000:
+        return "Khách hàng trung thành"
+    elif recency <= 150 and frequency >= 3:
+        return "Khách hàng tiềm năng"
+    return "Khách hàng nguy cơ mất"
+
+
+class BoDuLieuKhachHang:
+    """
+    Dữ liệu khách hàng lưu trên đĩa dạng memmap (float64 để giữ đúng giá trị monetary).
+
+    - chuan_bi: đọc CSV theo khối, ghi đặc trưng + id ra file nhị phân và
+      học StandardScaler bằng partial_fit (bộ nhớ chỉ phụ thuộc chunksize)
+    - lay_lo: duyệt dữ liệu đã chuẩn hóa theo lô
+    - lay_mau: lấy mẫu ngẫu nhiên đã chuẩn hóa (dùng cho silhouette, khởi tạo tâm)
+
+    Đối tượng có thể truyền sang tiến trình con: memmap được mở lại từ file,
+    không sao chép dữ liệu.
+
+    Khi không truyền thu_muc_cache, dữ liệu nằm trong thư mục tạm và bị xóa ở close()
+    (hoặc khi thoát khối with).
+    """
+
+    def __init__(self, duong_dan_csv, features=None, id_col='khach_hang_id',
+                 thu_muc_cache=None, chunksize=500_000):
+        self.duong_dan_csv = duong_dan_csv
+        self.features = list(features or FEATURES_RFM)
+        self.id_col = id_col
+        self.thu_muc_cache = thu_muc_cache or tempfile.mkdtemp(prefix='phan_doan_')
+        self._xoa_khi_dong = not thu_muc_cache
+        self.chunksize = chunksize
+        self.scaler = None
+        self.n_samples = 0
+        self._X = None
+        self._ids = None
+
+    @property
+    def duong_dan_X(self):
+        return os.path.join(self.thu_muc_cache, 'features.f64')
+
+    @property
+    def duong_dan_ids(self):
+        return os.path.join(self.thu_muc_cache, 'ids.i64')
+
+    def chuan_bi(self):
+        """
+        Đọc CSV theo khối một lần duy nhất
+        """
+        os.makedirs(self.thu_muc_cache, exist_ok=True)
+        self.scaler = StandardScaler()
+        self.n_samples = 0
+        with open(self.duong_dan_X, 'wb') as f_x, open(self.duong_dan_ids, 'wb') as f_id:
+            for chunk in pd.read_csv(self.duong_dan_csv, usecols=[self.id_col] + self.features,
+                                     chunksize=self.chunksize):
+                X = chunk[self.features].to_numpy(dtype=np.float64)
+                self.scaler.partial_fit(X)
+                X.tofile(f_x)
+                chunk[self.id_col].to_numpy(dtype=np.int64).tofile(f_id)
+                self.n_samples += len(chunk)
+        self._X = None
+        self._ids = None
+        print(f"Đã đọc {self.n_samples:,} khách hàng, {len(self.features)} đặc trưng")
+        return self
+
+    @property
+    def X(self):
+        """Đặc trưng gốc (chưa chuẩn hóa), memmap chỉ đọc"""
+        if self._X is None:
+            self._X = np.memmap(self.duong_dan_X, dtype=np.float64, mode='r',
+                                shape=(self.n_samples, len(self.features)))
+        return self._X
+
+    @property
+    def ids(self):
+        if self._ids is None:
+            self._ids = np.memmap(self.duong_dan_ids, dtype=np.int64, mode='r', shape=(self.n_samples,))
+        return self._ids
+
+    def chuan_hoa(self, X):
+        return ((X - self.scaler.mean_) / self.scaler.scale_).astype(np.float32)
+
+    def lay_lo(self, batch_size=100_000, xao_tron=False, random_state=None):
+        """
+        Duyệt dữ liệu đã chuẩn hóa theo lô liên tiếp; xao_tron=True đổi thứ tự các lô
+        """
+        starts = np.arange(0, self.n_samples, batch_size)
+        if xao_tron:
+            np.random.default_rng(random_state).shuffle(starts)
+        for start in starts:
+            yield start, self.chuan_hoa(self.X[start:start + batch_size])
+
+    def lay_mau(self, n=10_000, random_state=42):
+        """
+        Lấy mẫu ngẫu nhiên không lặp, đã chuẩn hóa
+        """
+        n = min(n, self.n_samples)
+        rng = np.random.default_rng(random_state)
+        idx = np.sort(rng.choice(self.n_samples, size=n, replace=False))
+        return self.chuan_hoa(self.X[idx])
+
+    def close(self):
+        """Đóng memmap; xóa thư mục cache nếu đó là thư mục tạm do đối tượng tự tạo"""
+        self._X = None
+        self._ids = None
+        if self._xoa_khi_dong:
+            shutil.rmtree(self.thu_muc_cache, ignore_errors=True)
+            self._xoa_khi_dong = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_X'] = None
+        state['_ids'] = None
+        # Bản sao ở tiến trình con không được xóa thư mục cache của tiến trình chính
+        state['_xoa_khi_dong'] = False
+        return state
+
+
+def _huan_luyen_minibatch(bo_du_lieu, n_clusters, batch_size=10_000, n_epochs=3,
+                          n_mau_khoi_tao=50_000, random_state=42):
+    """
+    Huấn luyện MiniBatchKMeans theo từng lô của memmap.
+    Tâm ban đầu chọn bằng k-means++ trên một mẫu ngẫu nhiên.
+    """
+    mau = bo_du_lieu.lay_mau(max(n_mau_khoi_tao, n_clusters), random_state=random_state)
+    tam_ban_dau, _ = kmeans_plusplus(mau, n_clusters, random_state=random_state)
+    model = MiniBatchKMeans(n_clusters=n_clusters, init=tam_ban_dau, n_init=1,
+                            batch_size=batch_size, random_state=random_state)
+    # Lần partial_fit đầu tiên yêu cầu n_samples >= n_clusters: dùng mẫu khởi tạo thay vì một lô
+    # ngẫu nhiên (lô cuối có thể ngắn hơn n_clusters)
+    model.partial_fit(mau)
+    for epoch in range(n_epochs):
+        for _, X in bo_du_lieu.lay_lo(batch_size, xao_tron=True, random_state=random_state + epoch):
+            model.partial_fit(X)
+    return model
+
+
+def _tinh_inertia(model, bo_du_lieu, batch_size=100_000):
+    """Inertia trên toàn bộ dữ liệu, tính theo lô"""
+    return float(sum(-model.score(X) for _, X in bo_du_lieu.lay_lo(batch_size)))
+
+
+def _danh_gia_mot_k(bo_du_lieu, k, mau, batch_size, n_epochs, random_state):
+    model = _huan_luyen_minibatch(bo_du_lieu, k, batch_size, n_epochs, random_state=random_state)
+    inertia = _tinh_inertia(model, bo_du_lieu)
+    silhouette = silhouette_score(mau, model.predict(mau))
+    return k, inertia, silhouette
+
+
+class TimSoCumSongSong:
+    """
+    Tìm số cụm tối ưu (Elbow + Silhouette) như TimSoCumToiUu, nhưng:
+    - mỗi K được huấn luyện bằng MiniBatchKMeans trong một tiến trình riêng
+    - silhouette tính trên mẫu n_mau_silhouette điểm (O(n²) nên không dùng toàn bộ)
+    """
+
+    def __init__(self, k_min=2, max_clusters=10, n_jobs=-1, batch_size=10_000,
+                 n_epochs=3, n_mau_silhouette=10_000, random_state=42):
+        self.k_range = range(k_min, max_clusters + 1)
+        self.n_jobs = n_jobs
+        self.batch_size = batch_size
+        self.n_epochs = n_epochs
+        self.n_mau_silhouette = n_mau_silhouette
+        self.random_state = random_state
+        self.inertias = []
+        self.silhouette_scores = []
+
+    def tim_so_cum(self, bo_du_lieu):
+        """
+        Tính inertia và silhouette cho mỗi K, các K chạy song song
+        """
+        print(f"Đang thử K = {self.k_range.start}..{self.k_range.stop - 1} song song...")
+        mau = bo_du_lieu.lay_mau(self.n_mau_silhouette, random_state=self.random_state)
+        ket_qua = Parallel(n_jobs=self.n_jobs)(
+            delayed(_danh_gia_mot_k)(bo_du_lieu, k, mau, self.batch_size,
+                                     self.n_epochs, self.random_state)
+            for k in self.k_range
+        )
+        ket_qua.sort()
+        self.inertias = [inertia for _, inertia, _ in ket_qua]
+        self.silhouette_scores = [silhouette for _, _, silhouette in ket_qua]
+        for k, inertia, silhouette in ket_qua:
+            print(f"K={k}: Inertia={inertia:.2f}, Silhouette (ước lượng)={silhouette:.3f}")
+        return self
+
+    def goi_y_so_cum(self):
+        """
+        Gợi ý K theo silhouette (và in thêm gợi ý theo Elbow)
+        """
+        best_idx = int(np.argmax(self.silhouette_scores))
+        best_k = self.k_range[best_idx]
+        print(f"\n=== GỢI Ý SỐ CỤM TỐI ƯU ===")
+        print(f"Dựa trên điểm Silhouette: K = {best_k}")
+        if len(self.inertias) >= 3:
+            second_differences = np.diff(np.diff(self.inertias))
+            elbow_k = self.k_range[int(np.argmax(second_differences)) + 1]
+            print(f"Dựa trên phương pháp Elbow: K = {elbow_k}")
+        return best_k
+
+
+class PhanCumMiniBatch:
+    """
+    K-means cho dữ liệu lớn bằng MiniBatchKMeans, dữ liệu được duyệt theo lô
+    """
+
+    def __init__(self, n_clusters=4, batch_size=10_000, n_epochs=3, random_state=42):
+        self.n_clusters = n_clusters
+        self.batch_size = batch_size
+        self.n_epochs = n_epochs
+        self.random_state = random_state
+        self.kmeans = None
+        self.centroids = None
+        self.inertia = None
+
+    def huan_luyen(self, bo_du_lieu):
+        self.kmeans = _huan_luyen_minibatch(bo_du_lieu, self.n_clusters, self.batch_size,
+                                            self.n_epochs, random_state=self.random_state)
+        self.centroids = self.kmeans.cluster_centers_
+        self.inertia = _tinh_inertia(self.kmeans, bo_du_lieu)
+        print(f"Đã hoàn thành phân cụm với {self.n_clusters} cụm")
+        print(f"Độ biến thiên trong cụm (inertia): {self.inertia:.2f}")
+        return self
+
+    def du_doan(self, X_chuan_hoa):
+        if self.kmeans is None:
+            raise ValueError("Chưa huấn luyện mô hình")
+        return self.kmeans.predict(X_chuan_hoa)
+
+    def tam_cum(self):
+        """Các tâm (không gian đã chuẩn hóa) và nhãn cụm của từng tâm"""
+        return self.centroids, np.arange(self.n_clusters)
+
+
+class PhanCumPhanCapDaiDien:
+    """
+    Phân cụm phân cấp cho dữ liệu lớn.
+
+    scipy linkage cần O(n²) bộ nhớ nên không chạy được trên hàng triệu điểm.
+    Thay vào đó: nén dữ liệu thành n_dai_dien tâm micro-cluster bằng MiniBatchKMeans,
+    chạy linkage trên các tâm này, rồi mỗi điểm nhận nhãn của tâm gần nhất.
+    """
+
+    def __init__(self, n_clusters=4, n_dai_dien=1000, linkage_method='ward',
+                 batch_size=10_000, n_epochs=2, random_state=42):
+        self.n_clusters = n_clusters
+        self.n_dai_dien = n_dai_dien
+        self.linkage_method = linkage_method
+        self.batch_size = batch_size
+        self.n_epochs = n_epochs
+        self.random_state = random_state
+        self.dai_dien = None          # tọa độ các điểm đại diện (đã chuẩn hóa)
+        self.nhan_dai_dien = None     # nhãn cụm của từng điểm đại diện
+        self.linkage_matrix = None
+
+    def huan_luyen(self, bo_du_lieu):
+        n_dai_dien = min(self.n_dai_dien, bo_du_lieu.n_samples)
+        micro = _huan_luyen_minibatch(bo_du_lieu, n_dai_dien, max(self.batch_size, 3 * n_dai_dien),
+                                      self.n_epochs, random_state=self.random_state)
+        self.dai_dien = micro.cluster_centers_
+        self.linkage_matrix = linkage(self.dai_dien, method=self.linkage_method)
+        self.nhan_dai_dien = fcluster(self.linkage_matrix, t=self.n_clusters, criterion='maxclust') - 1
+
+        so_cum_thuc_te = len(np.unique(self.nhan_dai_dien))
+        print(f"Đã hoàn thành phân cụm phân cấp với {so_cum_thuc_te} cụm "
+              f"trên {n_dai_dien} điểm đại diện")
+        print(f"Phương pháp liên kết: {self.linkage_method}")
+        return self
+
+    def du_doan(self, X_chuan_hoa):
+        if self.dai_dien is None:
+            raise ValueError("Chưa huấn luyện mô hình")
+        return self.nhan_dai_dien[pairwise_distances_argmin(X_chuan_hoa, self.dai_dien)]
+
+    def tam_cum(self):
+        """Các điểm đại diện (không gian đã chuẩn hóa) và nhãn cụm của từng điểm"""
+        return self.dai_dien, self.nhan_dai_dien
+
+
+class PhanDoanKhachHangQuyMoLon:
+    """
+    Quy trình phân đoạn khách hàng hoàn chỉnh cho dữ liệu lớn:
+    chuẩn bị dữ liệu -> tìm K -> phân cụm -> đặt tên -> ghi kết quả
+    """
+
+    def __init__(self, bo_du_lieu, phuong_phap='kmeans', n_jobs=-1, random_state=42):
+        if phuong_phap not in ('kmeans', 'phan_cap'):
+            raise ValueError("phuong_phap phải là 'kmeans' hoặc 'phan_cap'")
+        self.bo_du_lieu = bo_du_lieu
+        self.phuong_phap = phuong_phap
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.model = None
+        self.cluster_names = {}
+        self.segments_info = {}
+
+    def tim_so_cum_toi_uu(self, k_min=2, max_clusters=8, **kwargs):
+        print("\n=== TÌM SỐ CỤM TỐI ƯU ===")
+        tim_cum = TimSoCumSongSong(k_min=k_min, max_clusters=max_clusters, n_jobs=self.n_jobs,
+                                   random_state=self.random_state, **kwargs)
+        return tim_cum.tim_so_cum(self.bo_du_lieu).goi_y_so_cum()
+
+    def thuc_hien_phan_cum(self, n_clusters=4, **kwargs):
+        print(f"\n=== THỰC HIỆN PHÂN CỤM VỚI {n_clusters} CỤM ===")
+        if self.phuong_phap == 'kmeans':
+            self.model = PhanCumMiniBatch(n_clusters, random_state=self.random_state, **kwargs)
+        else:
+            self.model = PhanCumPhanCapDaiDien(n_clusters, random_state=self.random_state, **kwargs)
+        self.model.huan_luyen(self.bo_du_lieu)
+
+        mau = self.bo_du_lieu.lay_mau(10_000, random_state=self.random_state)
+        print(f"Điểm Silhouette (ước lượng): {silhouette_score(mau, self.model.du_doan(mau)):.3f}")
+        return self
+
+    def gan_nhan(self, batch_size=100_000):
+        """Duyệt toàn bộ dữ liệu, trả về (start, nhãn) cho từng lô"""
+        for start, X in self.bo_du_lieu.lay_lo(batch_size):
+            yield start, self.model.du_doan(X)
+
+    def dat_ten_cum(self):
+        """
+        Đặt tên cụm theo RFM trung bình, tính bằng np.bincount trên từng lô
+        """
+        print("\n=== ĐẶT TÊN CÁC CỤM ===")
+        n_features = len(self.bo_du_lieu.features)
+        so_luong = np.zeros(self.model.n_clusters, dtype=np.int64)
+        tong = np.zeros((self.model.n_clusters, n_features))
+        for start, labels in self.gan_nhan():
+            X = self.bo_du_lieu.X[start:start + len(labels)]
+            so_luong += np.bincount(labels, minlength=self.model.n_clusters)
+            for j in range(n_features):
+                tong[:, j] += np.bincount(labels, weights=X[:, j], minlength=self.model.n_clusters)
+
+        trung_binh = tong / np.maximum(so_luong, 1)[:, None]
+        features = self.bo_du_lieu.features
+        co_rfm = all(f in features for f in FEATURES_RFM)
+        for cluster_id in range(self.model.n_clusters):
+            if so_luong[cluster_id] == 0:
+                continue
+            info = dict(zip(features, trung_binh[cluster_id]))
+            self.segments_info[cluster_id] = {
+                'ten': f'Cụm {cluster_id + 1}',
+                'so_luong': int(so_luong[cluster_id]),
+                'ty_le': so_luong[cluster_id] / self.bo_du_lieu.n_samples * 100,
+                **{f'{f}_tb': v for f, v in info.items()},
+            }
+            if co_rfm:
+                ten = dat_ten_theo_rfm(info['recency'], info['frequency'], info['monetary'])
+            else:
+                ten = f'Cụm {cluster_id + 1}'
+            self.cluster_names[cluster_id] = ten
+            print(f"Cụm {cluster_id + 1}: {ten} ({so_luong[cluster_id]:,} khách hàng)")
+        return self.cluster_names
+
+    def luu_ket_qua(self, duong_dan):
+        """
+        Ghi kết quả theo khối: khach_hang_id, các đặc trưng, cum_du_doan, ten_cum
+        """
+        ten_cum = np.array([self.cluster_names.get(i, f'Cụm {i + 1}')
+                            for i in range(self.model.n_clusters)], dtype=object)
+        header = True
+        for start, labels in self.gan_nhan():
+            end = start + len(labels)
+            df = pd.DataFrame(self.bo_du_lieu.X[start:end], columns=self.bo_du_lieu.features)
+            df.insert(0, 'khach_hang_id', self.bo_du_lieu.ids[start:end])
+            df['cum_du_doan'] = labels
+            df['ten_cum'] = ten_cum[labels]
+            df.to_csv(duong_dan, mode='w' if header else 'a', header=header, index=False,
+                      float_format='%.10g')
+            header = False
+        print(f"Đã lưu kết quả vào {duong_dan}")
+        return self
+
+    def luu_mo_hinh(self, duong_dan):
+        """
+        Lưu scaler, các tâm và tên cụm ra file .npz để gán cụm cho khách hàng mới
+        (gán theo tâm gần nhất, xem docker_example/segment_server.py)
+        """
+        tam, nhan_tam = self.model.tam_cum()
+        np.savez(duong_dan,
+                 features=np.array(self.bo_du_lieu.features),
+                 mean=self.bo_du_lieu.scaler.mean_,
+                 scale=self.bo_du_lieu.scaler.scale_,
+                 tam=np.asarray(tam, dtype=np.float64),
+                 nhan_tam=np.asarray(nhan_tam, dtype=np.int64),
+                 ten_cum=np.array([self.cluster_names.get(i, f'Cụm {i + 1}')
+                                   for i in range(self.model.n_clusters)]))
+        print(f"Đã lưu mô hình vào {duong_dan}")
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Phân đoạn khách hàng RFM cho dữ liệu lớn")
+    parser.add_argument('input', help="CSV khách hàng (có khach_hang_id và các đặc trưng)")
+    parser.add_argument('output', nargs='?', default='ket_qua_phan_doan_khach_hang.csv')
+    parser.add_argument('--features', nargs='+', default=FEATURES_RFM)
+    parser.add_argument('--n-clusters', type=int, help="Số cụm; bỏ trống để tự tìm")
+    parser.add_argument('--k-min', type=int, default=2)
+    parser.add_argument('--k-max', type=int, default=8)
+    parser.add_argument('--phuong-phap', choices=['kmeans', 'phan_cap'], default='kmeans')
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--chunksize', type=int, default=500_000)
+    parser.add_argument('--cache-dir', help="Thư mục lưu memmap trung gian")
+    parser.add_argument('--model-out', help="File .npz lưu scaler và tâm cụm cho segment_server.py")
+    args = parser.parse_args()
+
+    with BoDuLieuKhachHang(args.input, args.features, thu_muc_cache=args.cache_dir,
+                           chunksize=args.chunksize) as bo_du_lieu:
+        bo_du_lieu.chuan_bi()
+        pipeline = PhanDoanKhachHangQuyMoLon(bo_du_lieu, args.phuong_phap, n_jobs=args.n_jobs)
+        n_clusters = args.n_clusters or pipeline.tim_so_cum_toi_uu(args.k_min, args.k_max)
+        pipeline.thuc_hien_phan_cum(n_clusters)
+        pipeline.dat_ten_cum()
+        pipeline.luu_ket_qua(args.output)
+        if args.model_out:
+            pipeline.luu_mo_hinh(args.model_out)
+
+
+if __name__ == "__main__":
+    main()
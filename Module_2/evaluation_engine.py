@@ -0,0 +1,301 @@
+"""
+Bộ máy xác thực chéo và tối ưu siêu tham số, tách từ model_evaluation.ipynb
+(BoDanhGiaXacThucCheo, minh_hoa_toi_uu_sieu_tham_so).
+
+- Mỗi cặp (bộ tham số, fold) là một tác vụ độc lập, chạy song song trên process pool (joblib/loky)
+- Kết quả từng fold được lưu cache trên đĩa, khóa theo mô hình + tham số + hash dữ liệu + fold,
+  nên chạy lại cùng một lưới chỉ tính các tổ hợp mới
+- Successive halving: thử tất cả ứng viên với ít tài nguyên (số mẫu hoặc số cây), giữ lại 1/factor tốt nhất,
+  tăng tài nguyên lên factor lần, lặp lại cho tới khi còn một ứng viên hoặc đạt mức tối đa
+"""
+import json
+import os
+import time
+
+import numpy as np
+from joblib import Parallel, delayed, hash as joblib_hash
+from sklearn.base import clone, is_classifier
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import KFold, ParameterGrid, ParameterSampler, StratifiedKFold
+
+
+def _chay_mot_fold(estimator, params, X, y, train_idx, test_idx, scoring):
+    """Huấn luyện một bộ tham số trên một fold (chạy trong tiến trình con)"""
+    model = clone(estimator).set_params(**params)
+    bat_dau = time.perf_counter()
+    model.fit(X[train_idx], y[train_idx])
+    fit_time = time.perf_counter() - bat_dau
+
+    bat_dau = time.perf_counter()
+    score = get_scorer(scoring)(model, X[test_idx], y[test_idx])
+    score_time = time.perf_counter() - bat_dau
+    return {'score': float(score), 'fit_time': fit_time, 'score_time': score_time}
+
+
+class BoNhoDemKetQua:
+    """
+    Cache kết quả fold trên đĩa, mỗi kết quả một file JSON nhỏ đặt tên theo khóa
+    """
+
+    def __init__(self, thu_muc='.cv_cache'):
+        self.thu_muc = thu_muc
+        if thu_muc:
+            os.makedirs(thu_muc, exist_ok=True)
+
+    def _duong_dan(self, khoa):
+        return os.path.join(self.thu_muc, khoa[:2], f'{khoa}.json')
+
+    def lay(self, khoa):
+        if not self.thu_muc:
+            return None
+        try:
+            with open(self._duong_dan(khoa), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def luu(self, khoa, ket_qua):
+        if not self.thu_muc:
+            return
+        duong_dan = self._duong_dan(khoa)
+        os.makedirs(os.path.dirname(duong_dan), exist_ok=True)
+        tmp = f'{duong_dan}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(ket_qua, f)
+        os.replace(tmp, duong_dan)
+
+
+class BoTimSieuThamSo:
+    """
+    Tìm siêu tham số bằng xác thực chéo song song, có cache và successive halving.
+
+    Ví dụ:
+        tim = BoTimSieuThamSo(RandomForestClassifier(random_state=42), param_grid, cv=5)
+        tim.tim_kiem_luoi(X_train, y_train)            # tương đương GridSearchCV
+        tim.successive_halving(X_train, y_train)       # tương đương HalvingGridSearchCV
+        tim.successive_halving(X_train, y_train, tai_nguyen='n_estimators')
+        tim.best_params_, tim.best_score_, tim.huan_luyen_lai(X_train, y_train)
+    """
+
+    def __init__(self, estimator, param_grid, cv=5, scoring='accuracy', n_jobs=-1,
+                 thu_muc_cache='.cv_cache', n_iter=None, random_state=42, verbose=1):
+        """
+        Args:
+            param_grid: dict (hoặc list dict) không gian tham số như GridSearchCV
+            n_iter: nếu đặt, lấy ngẫu nhiên n_iter bộ tham số (như RandomizedSearchCV)
+            thu_muc_cache: thư mục lưu kết quả fold; None để tắt cache
+        """
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.cv = cv
+        self.scoring = scoring
+        self.n_jobs = n_jobs
+        self.n_iter = n_iter
+        self.random_state = random_state
+        self.verbose = verbose
+        self.cache = BoNhoDemKetQua(thu_muc_cache)
+        self.ket_qua = []
+        self.best_params_ = None
+        self.best_score_ = None
+        self.best_estimator_ = None
+
+    def danh_sach_ung_vien(self):
+        if self.n_iter is None:
+            return list(ParameterGrid(self.param_grid))
+        return list(ParameterSampler(self.param_grid, self.n_iter, random_state=self.random_state))
+
+    def _chia_fold(self, y):
+        if is_classifier(self.estimator):
+            splitter = StratifiedKFold(n_splits=self.cv, shuffle=True, random_state=self.random_state)
+        else:
+            splitter = KFold(n_splits=self.cv, shuffle=True, random_state=self.random_state)
+        return list(splitter.split(np.zeros(len(y)), y))
+
+    def _khoa(self, params, hash_du_lieu, fold):
+        return joblib_hash((type(self.estimator).__module__, type(self.estimator).__name__,
+                            self.estimator.get_params(), params, hash_du_lieu,
+                            self.cv, self.random_state, fold, self.scoring))
+
+    def danh_gia(self, X, y, danh_sach_tham_so, chi_so=None):
+        """
+        Xác thực chéo cho từng bộ tham số; chỉ các (tham số, fold) chưa có trong cache được tính.
+
+        Args:
+            chi_so: chỉ dùng các dòng này của X, y (successive halving dùng để giới hạn dữ liệu)
+
+        Returns:
+            list dict: params, mean_score, std_score, scores, fit_time, tu_cache
+        """
+        X = np.asarray(X)
+        y = np.asarray(y)
+        if chi_so is not None:
+            X, y = X[chi_so], y[chi_so]
+        hash_du_lieu = joblib_hash((X, y))
+        folds = self._chia_fold(y)
+
+        khoa = [[self._khoa(params, hash_du_lieu, i) for i in range(len(folds))]
+                for params in danh_sach_tham_so]
+        ket_qua_fold = {k: self.cache.lay(k) for hang in khoa for k in hang}
+        can_chay = [(p, i) for p, hang in enumerate(khoa) for i, k in enumerate(hang)
+                    if ket_qua_fold[k] is None]
+
+        if self.verbose:
+            print(f"   {len(danh_sach_tham_so)} bộ tham số x {len(folds)} fold = "
+                  f"{len(danh_sach_tham_so) * len(folds)} tác vụ, {len(can_chay)} cần chạy, "
+                  f"{len(danh_sach_tham_so) * len(folds) - len(can_chay)} lấy từ cache, {len(y)} mẫu")
+
+        if can_chay:
+            ket_qua_moi = Parallel(n_jobs=self.n_jobs)(
+                delayed(_chay_mot_fold)(self.estimator, danh_sach_tham_so[p], X, y,
+                                        folds[i][0], folds[i][1], self.scoring)
+                for p, i in can_chay
+            )
+            for (p, i), kq in zip(can_chay, ket_qua_moi):
+                ket_qua_fold[khoa[p][i]] = kq
+                self.cache.luu(khoa[p][i], kq)
+
+        ket_qua = []
+        chay_moi = {khoa[p][i] for p, i in can_chay}
+        for params, hang in zip(danh_sach_tham_so, khoa):
+            scores = np.array([ket_qua_fold[k]['score'] for k in hang])
+            ket_qua.append({
+                'params': params,
+                'mean_score': float(scores.mean()),
+                'std_score': float(scores.std()),
+                'scores': scores.tolist(),
+                'fit_time': float(np.mean([ket_qua_fold[k]['fit_time'] for k in hang])),
+                'n_samples': len(y),
+                'tu_cache': not any(k in chay_moi for k in hang),
+            })
+        return ket_qua
+
+    def _chon_tot_nhat(self, ket_qua):
+        tot_nhat = max(ket_qua, key=lambda kq: kq['mean_score'])
+        self.best_params_ = tot_nhat['params']
+        self.best_score_ = tot_nhat['mean_score']
+        if self.verbose:
+            print(f"   Tham số tốt nhất: {self.best_params_}")
+            print(f"   Điểm tốt nhất: {self.best_score_:.4f}")
+
+    def tim_kiem_luoi(self, X, y):
+        """
+        Đánh giá mọi ứng viên trên toàn bộ dữ liệu (Grid Search / Random Search)
+        """
+        bat_dau = time.perf_counter()
+        self.ket_qua = self.danh_gia(X, y, self.danh_sach_ung_vien())
+        self._chon_tot_nhat(self.ket_qua)
+        if self.verbose:
+            print(f"   Thời gian: {time.perf_counter() - bat_dau:.1f}s")
+        return self
+
+    def successive_halving(self, X, y, factor=3, tai_nguyen='n_samples', min_resources=None, max_resources=None):
+        """
+        Successive halving: mỗi vòng giữ lại 1/factor ứng viên và tăng tài nguyên lên factor lần.
+
+        Args:
+            tai_nguyen: 'n_samples' (số mẫu huấn luyện) hoặc tên một tham số của mô hình,
+                ví dụ 'n_estimators' cho rừng ngẫu nhiên; tham số này bị bỏ khỏi lưới
+            min_resources: tài nguyên ở vòng đầu (mặc định: đủ để vòng cuối dùng max_resources)
+            max_resources: tài nguyên tối đa (mặc định: số mẫu, hoặc giá trị lớn nhất trong lưới)
+        """
+        bat_dau = time.perf_counter()
+        n = len(y)
+        ung_vien = self.danh_sach_ung_vien()
+        theo_mau = tai_nguyen == 'n_samples'
+        if theo_mau:
+            max_resources = max_resources or n
+        else:
+            if max_resources is None:
+                max_resources = max(p[tai_nguyen] for p in ung_vien if tai_nguyen in p)
+            ung_vien = list({joblib_hash(p): p for p in
+                             ({k: v for k, v in p.items() if k != tai_nguyen} for p in ung_vien)}.values())
+
+        # Số vòng: mỗi vòng giữ lại ceil(n / factor) ứng viên cho tới vòng quyết định (còn <= factor).
+        # Đếm bằng số nguyên vì log(243) / log(3) cho 4.999999999999999
+        so_vong, con_lai = 1, len(ung_vien)
+        while con_lai > factor:
+            con_lai = -(-con_lai // factor)
+            so_vong += 1
+        if min_resources is None:
+            min_resources = max(max_resources // factor ** (so_vong - 1), 4 * self.cv if theo_mau else 1)
+        thu_tu = np.random.default_rng(self.random_state).permutation(n)
+
+        self.ket_qua = []
+        muc = min_resources
+        vong = 0
+        while True:
+            muc = min(muc, max_resources)
+            if len(ung_vien) <= factor:
+                # Vòng quyết định: sau vòng này chỉ còn một ứng viên, nên dùng đủ tài nguyên tối đa
+                muc = max_resources
+            if self.verbose:
+                print(f"Vòng {vong}: {len(ung_vien)} ứng viên, {tai_nguyen}={muc}")
+            if theo_mau:
+                ket_qua_vong = self.danh_gia(X, y, ung_vien, chi_so=np.sort(thu_tu[:muc]))
+            else:
+                ket_qua_vong = self.danh_gia(X, y, [{**p, tai_nguyen: muc} for p in ung_vien])
+            for kq, p in zip(ket_qua_vong, ung_vien):
+                kq['vong'] = vong
+                kq['ung_vien'] = p
+            self.ket_qua.extend(ket_qua_vong)
+
+            if len(ung_vien) == 1 or muc >= max_resources:
+                break
+            ket_qua_vong.sort(key=lambda kq: kq['mean_score'], reverse=True)
+            giu_lai = max(1, int(np.ceil(len(ung_vien) / factor)))
+            ung_vien = [kq['ung_vien'] for kq in ket_qua_vong[:giu_lai]]
+            muc *= factor
+            vong += 1
+
+        self._chon_tot_nhat(ket_qua_vong)
+        if self.verbose:
+            print(f"   Thời gian: {time.perf_counter() - bat_dau:.1f}s")
+        return self
+
+    def huan_luyen_lai(self, X, y):
+        """Huấn luyện mô hình với tham số tốt nhất trên toàn bộ dữ liệu"""
+        if self.best_params_ is None:
+            raise ValueError("Chưa tìm kiếm siêu tham số")
+        self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_).fit(X, y)
+        return self.best_estimator_
+
+
+def minh_hoa_toi_uu_sieu_tham_so(thu_muc_cache='.cv_cache'):
+    """
+    Cùng bài toán với minh_hoa_toi_uu_sieu_tham_so trong notebook, chạy bằng BoTimSieuThamSo
+    """
+    from sklearn.datasets import make_classification
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    print("=== TỐI ƯU SIÊU THAM SỐ ===")
+    X, y = make_classification(n_samples=1000, n_features=20, n_informative=10,
+                               n_redundant=10, n_clusters_per_class=1, random_state=42)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+
+    param_grid = {
+        'n_estimators': [50, 100, 200],
+        'max_depth': [5, 10, 15, None],
+        'min_samples_split': [2, 5, 10],
+        'min_samples_leaf': [1, 2, 4]
+    }
+    rf = RandomForestClassifier(random_state=42)
+
+    print("1. Tìm kiếm lưới (Grid Search):")
+    grid = BoTimSieuThamSo(rf, param_grid, cv=5, thu_muc_cache=thu_muc_cache).tim_kiem_luoi(X_train_scaled, y_train)
+    print(f"   Điểm trên tập test: {grid.huan_luyen_lai(X_train_scaled, y_train).score(X_test_scaled, y_test):.4f}")
+
+    print("\n2. Successive halving theo số cây (n_estimators 10 -> 200):")
+    halving = BoTimSieuThamSo(rf, param_grid, cv=5, thu_muc_cache=thu_muc_cache).successive_halving(
+        X_train_scaled, y_train, tai_nguyen='n_estimators', min_resources=10)
+    print(f"   Điểm trên tập test: {halving.huan_luyen_lai(X_train_scaled, y_train).score(X_test_scaled, y_test):.4f}")
+
+    return grid, halving
+
+
+if __name__ == "__main__":
+    minh_hoa_toi_uu_sieu_tham_so()
@@ -0,0 +1,87 @@
+"""
+So sánh tốc độ (mẫu/giây) giữa MangNeuronNhanTao (bản notebook) và MangNeuronMiniBatch.
+
+- Bộ dữ liệu 1: hình tròn đồng tâm 1000 mẫu (tao_du_lieu_phan_loai_phuc_tap trong notebook)
+- Bộ dữ liệu 2: 1 triệu dòng tổng hợp cùng dạng
+
+Chạy: python benchmark_mlp.py [--so-dong 1000000] [--epoch-lon 3]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from neural_network import MangNeuronMiniBatch, MangNeuronNhanTao
+
+
+def tao_du_lieu_hinh_tron(n_samples=1000, random_state=42):
+    """
+    Hai vòng tròn đồng tâm: lớp 0 bán kính 0..1, lớp 1 bán kính 1.5..2.5
+    """
+    rng = np.random.default_rng(random_state)
+    nua = n_samples // 2
+    r = np.concatenate([rng.uniform(0, 1, nua), rng.uniform(1.5, 2.5, n_samples - nua)])
+    theta = rng.uniform(0, 2 * np.pi, n_samples)
+    X = np.column_stack([r * np.cos(theta), r * np.sin(theta)])
+    y = np.concatenate([np.zeros(nua), np.ones(n_samples - nua)])
+    idx = rng.permutation(n_samples)
+    return X[idx], y[idx]
+
+
+def do_toc_do(mlp, X, y, so_epoch):
+    """Trả về (mẫu/giây khi huấn luyện, mẫu/giây khi dự đoán, độ chính xác)"""
+    bat_dau = time.perf_counter()
+    mlp.huan_luyen(X, y, so_epoch=so_epoch, in_qua_trinh=False)
+    thoi_gian_huan_luyen = time.perf_counter() - bat_dau
+
+    bat_dau = time.perf_counter()
+    y_prob = mlp.du_doan(X)
+    thoi_gian_du_doan = time.perf_counter() - bat_dau
+
+    do_chinh_xac = np.mean((y_prob >= 0.5) == y)
+    return len(X) * so_epoch / thoi_gian_huan_luyen, len(X) / thoi_gian_du_doan, do_chinh_xac
+
+
+def chay_benchmark(ten, X, y, kien_truc, so_epoch, kich_thuoc_batch):
+    print(f"\n=== {ten}: {len(X):,} mẫu, {so_epoch} epoch, kiến trúc {' -> '.join(map(str, kien_truc))} ===")
+    print(f"{'Mô hình':<28}{'Huấn luyện (mẫu/s)':>22}{'Dự đoán (mẫu/s)':>20}{'Accuracy':>10}")
+
+    ket_qua = {}
+    np.random.seed(42)
+    goc = MangNeuronNhanTao(kien_truc, ham_kich_hoat='tanh', he_so_hoc=0.1)
+    ket_qua['goc'] = do_toc_do(goc, X, y, so_epoch)
+
+    np.random.seed(42)
+    mini_batch = MangNeuronMiniBatch(kien_truc, ham_kich_hoat='tanh', he_so_hoc=0.1,
+                                     kich_thuoc_batch=kich_thuoc_batch)
+    ket_qua['mini_batch'] = do_toc_do(mini_batch, X, y, so_epoch)
+
+    for ten_mo_hinh, nhan in [('goc', 'Notebook (full-batch f64)'),
+                              ('mini_batch', f'Mini-batch f32 (batch={kich_thuoc_batch})')]:
+        huan_luyen, du_doan, acc = ket_qua[ten_mo_hinh]
+        print(f"{nhan:<28}{huan_luyen:>22,.0f}{du_doan:>20,.0f}{acc:>10.4f}")
+
+    print(f"Tăng tốc huấn luyện: {ket_qua['mini_batch'][0] / ket_qua['goc'][0]:.1f}x, "
+          f"dự đoán: {ket_qua['mini_batch'][1] / ket_qua['goc'][1]:.1f}x")
+    return ket_qua
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MLP NumPy")
+    parser.add_argument('--so-dong', type=int, default=1_000_000, help="Số dòng của bộ dữ liệu lớn")
+    parser.add_argument('--epoch-nho', type=int, default=200, help="Số epoch cho bộ 1000 mẫu")
+    parser.add_argument('--epoch-lon', type=int, default=3, help="Số epoch cho bộ dữ liệu lớn")
+    parser.add_argument('--batch', type=int, default=256)
+    args = parser.parse_args()
+
+    kien_truc = [2, 10, 8, 1]
+
+    X, y = tao_du_lieu_hinh_tron(1000)
+    chay_benchmark("Hình tròn đồng tâm", X, y, kien_truc, args.epoch_nho, args.batch)
+
+    X, y = tao_du_lieu_hinh_tron(args.so_dong, random_state=0)
+    chay_benchmark("Dữ liệu tổng hợp", X, y, kien_truc, args.epoch_lon, args.batch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,520 @@
+"""
+Mạng neuron đa lớp (MLP) viết bằng NumPy, tách từ basic_neral_network.ipynb.
+
+- MangNeuronNhanTao: bản gốc trong notebook (full-batch, float64), giữ làm bản tham chiếu
+- MangNeuronMiniBatch: cùng thuật toán lan truyền ngược nhưng
+    * huấn luyện theo mini-batch đã xáo trộn
+    * chạy bằng float32
+    * mọi mảng kích hoạt / gradient được cấp phát một lần và dùng lại cho mọi batch,
+      các phép tính ghi thẳng vào bộ đệm qua tham số out=
+"""
+import numpy as np
+from typing import List, Optional, Tuple
+
+
+class HamKichHoat:
+    """
+    Lớp chứa các hàm kích hoạt và đạo hàm của chúng
+    """
+
+    @staticmethod
+    def sigmoid(x):
+        """Hàm sigmoid"""
+        x = np.clip(x, -500, 500)  # Tránh overflow
+        return 1 / (1 + np.exp(-x))
+
+    @staticmethod
+    def sigmoid_dao_ham(x):
+        """Đạo hàm của sigmoid"""
+        s = HamKichHoat.sigmoid(x)
+        return s * (1 - s)
+
+    @staticmethod
+    def tanh(x):
+        """Hàm tanh"""
+        return np.tanh(x)
+
+    @staticmethod
+    def tanh_dao_ham(x):
+        """Đạo hàm của tanh"""
+        return 1 - np.tanh(x) ** 2
+
+    @staticmethod
+    def relu(x):
+        """Hàm ReLU"""
+        return np.maximum(0, x)
+
+    @staticmethod
+    def relu_dao_ham(x):
+        """Đạo hàm của ReLU"""
+        return (x > 0).astype(float)
+
+    @staticmethod
+    def leaky_relu(x, alpha=0.01):
+        """Hàm Leaky ReLU"""
+        return np.where(x > 0, x, alpha * x)
+
+    @staticmethod
+    def leaky_relu_dao_ham(x, alpha=0.01):
+        """Đạo hàm của Leaky ReLU"""
+        return np.where(x > 0, 1, alpha)
+
+
+class HamKichHoatTaiCho:
+    """
+    Các hàm kích hoạt ghi đè lên mảng đầu vào (không cấp phát mảng mới);
+    tam là bộ đệm nháp cùng shape cho hàm nào cần.
+
+    Đạo hàm được tính từ giá trị sau kích hoạt a thay vì z, nên lúc lan truyền
+    ngược không cần giữ lại z:
+        sigmoid' = a(1 - a), tanh' = 1 - a², relu' = [a > 0], leaky_relu' = 1 hoặc alpha
+    """
+
+    ALPHA = 0.01
+    # Ngưỡng cắt z trước exp để tránh overflow, ~87 với float32 và ~708 với float64
+    GIOI_HAN_SIGMOID = {np.dtype(t): float(np.log(np.finfo(t).max) - 1) for t in (np.float32, np.float64)}
+
+    @staticmethod
+    def sigmoid(z, tam=None):
+        gioi_han = HamKichHoatTaiCho.GIOI_HAN_SIGMOID[z.dtype]
+        np.clip(z, -gioi_han, gioi_han, out=z)
+        np.negative(z, out=z)
+        np.exp(z, out=z)
+        z += 1
+        np.reciprocal(z, out=z)
+
+    @staticmethod
+    def sigmoid_dao_ham(a, out):
+        np.subtract(1, a, out=out)
+        out *= a
+
+    @staticmethod
+    def tanh(z, tam=None):
+        np.tanh(z, out=z)
+
+    @staticmethod
+    def tanh_dao_ham(a, out):
+        np.multiply(a, a, out=out)
+        np.subtract(1, out, out=out)
+
+    @staticmethod
+    def relu(z, tam=None):
+        np.maximum(z, 0, out=z)
+
+    @staticmethod
+    def relu_dao_ham(a, out):
+        np.greater(a, 0, out=out)
+
+    @staticmethod
+    def leaky_relu(z, tam):
+        np.multiply(z, HamKichHoatTaiCho.ALPHA, out=tam)
+        np.maximum(z, tam, out=z)
+
+    @staticmethod
+    def leaky_relu_dao_ham(a, out):
+        np.greater(a, 0, out=out)
+        out *= 1 - HamKichHoatTaiCho.ALPHA
+        out += HamKichHoatTaiCho.ALPHA
+
+
+class MangNeuronNhanTao:
+    """
+    Lớp mạng neuron đa lớp hoàn chỉnh với thuật toán lan truyền ngược
+    """
+
+    def __init__(self, kich_thuoc_cac_lop: List[int], ham_kich_hoat: str = 'sigmoid', he_so_hoc: float = 0.01):
+        """
+        Khởi tạo mạng neuron
+
+        Args:
+            kich_thuoc_cac_lop: Danh sách số neuron trong từng lớp [đầu_vào, ẩn1, ẩn2, ..., đầu_ra]
+            ham_kich_hoat: Tên hàm kích hoạt ('sigmoid', 'tanh', 'relu', 'leaky_relu')
+            he_so_hoc: Tốc độ học
+        """
+        self.kich_thuoc_cac_lop = kich_thuoc_cac_lop
+        self.so_lop = len(kich_thuoc_cac_lop)
+        self.he_so_hoc = he_so_hoc
+
+        # Thiết lập hàm kích hoạt
+        self.thiet_lap_ham_kich_hoat(ham_kich_hoat)
+
+        # Khởi tạo trọng số và bias
+        self.khoi_tao_tham_so()
+
+        # Lưu trữ lịch sử huấn luyện (ghi lại mỗi chu_ky_ghi epoch)
+        self.lich_su_loss = []
+        self.lich_su_accuracy = []
+        self.chu_ky_ghi = 100
+
+    def thiet_lap_ham_kich_hoat(self, ten_ham: str):
+        """Thiết lập hàm kích hoạt và đạo hàm"""
+        if ten_ham == 'sigmoid':
+            self.ham_kich_hoat = HamKichHoat.sigmoid
+            self.dao_ham_kich_hoat = HamKichHoat.sigmoid_dao_ham
+        elif ten_ham == 'tanh':
+            self.ham_kich_hoat = HamKichHoat.tanh
+            self.dao_ham_kich_hoat = HamKichHoat.tanh_dao_ham
+        elif ten_ham == 'relu':
+            self.ham_kich_hoat = HamKichHoat.relu
+            self.dao_ham_kich_hoat = HamKichHoat.relu_dao_ham
+        elif ten_ham == 'leaky_relu':
+            self.ham_kich_hoat = HamKichHoat.leaky_relu
+            self.dao_ham_kich_hoat = HamKichHoat.leaky_relu_dao_ham
+        else:
+            raise ValueError(f"Hàm kích hoạt '{ten_ham}' không được hỗ trợ")
+        self.ten_ham_kich_hoat = ten_ham
+
+    def khoi_tao_tham_so(self):
+        """Khởi tạo trọng số và bias theo phương pháp Xavier"""
+        self.trong_so = []
+        self.bias = []
+
+        for i in range(self.so_lop - 1):
+            # Phương pháp Xavier initialization
+            fan_in = self.kich_thuoc_cac_lop[i]
+            fan_out = self.kich_thuoc_cac_lop[i + 1]
+            limit = np.sqrt(6 / (fan_in + fan_out))
+
+            W = np.random.uniform(-limit, limit, (self.kich_thuoc_cac_lop[i], self.kich_thuoc_cac_lop[i + 1]))
+            b = np.zeros((1, self.kich_thuoc_cac_lop[i + 1]))
+
+            self.trong_so.append(W)
+            self.bias.append(b)
+
+    def lan_truyen_thuan(self, X: np.ndarray) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """
+        Thực hiện lan truyền thuận
+
+        Args:
+            X: Dữ liệu đầu vào shape (n_samples, n_features)
+
+        Returns:
+            activations: Danh sách giá trị kích hoạt tại mỗi lớp
+            z_values: Danh sách giá trị trước khi kích hoạt
+        """
+        activations = [X]  # Lớp đầu vào
+        z_values = []
+
+        for i in range(self.so_lop - 1):
+            # Tính tổng có trọng số
+            z = np.dot(activations[i], self.trong_so[i]) + self.bias[i]
+            z_values.append(z)
+
+            # Áp dụng hàm kích hoạt
+            if i == self.so_lop - 2:  # Lớp cuối cùng
+                # Sử dụng sigmoid cho đầu ra nhị phân
+                a = HamKichHoat.sigmoid(z)
+            else:
+                a = self.ham_kich_hoat(z)
+
+            activations.append(a)
+
+        return activations, z_values
+
+    def lan_truyen_nguoc(self, X: np.ndarray, y: np.ndarray) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """
+        Thực hiện thuật toán lan truyền ngược
+
+        Args:
+            X: Dữ liệu đầu vào
+            y: Nhãn thực tế
+
+        Returns:
+            grad_w: Gradient của trọng số
+            grad_b: Gradient của bias
+        """
+        m = X.shape[0]  # Số mẫu
+
+        # Lan truyền thuận
+        activations, z_values = self.lan_truyen_thuan(X)
+
+        # Khởi tạo gradient
+        grad_w = [np.zeros_like(w) for w in self.trong_so]
+        grad_b = [np.zeros_like(b) for b in self.bias]
+
+        # Tính lỗi ở lớp cuối
+        delta = activations[-1] - y.reshape(-1, 1)
+
+        # Lan truyền ngược
+        for i in range(self.so_lop - 2, -1, -1):
+            # Tính gradient cho trọng số và bias
+            grad_w[i] = np.dot(activations[i].T, delta) / m
+            grad_b[i] = np.mean(delta, axis=0, keepdims=True)
+
+            # Tính delta cho lớp trước đó (nếu không phải lớp đầu tiên)
+            if i > 0:
+                # Gradient từ lớp tiếp theo
+                delta_prev = np.dot(delta, self.trong_so[i].T)
+
+                # Nhân với đạo hàm hàm kích hoạt
+                delta = delta_prev * self.dao_ham_kich_hoat(z_values[i-1])
+
+        return grad_w, grad_b
+
+    def cap_nhat_tham_so(self, grad_w: List[np.ndarray], grad_b: List[np.ndarray]):
+        """Cập nhật trọng số và bias"""
+        for i in range(len(self.trong_so)):
+            self.trong_so[i] -= self.he_so_hoc * grad_w[i]
+            self.bias[i] -= self.he_so_hoc * grad_b[i]
+
+    def tinh_loss(self, y_thuc: np.ndarray, y_du_doan: np.ndarray) -> float:
+        """Tính Binary Cross Entropy Loss"""
+        # Tránh log(0); với float32, 1 - 1e-15 làm tròn thành 1.0 nên dùng eps của kiểu dữ liệu
+        y_du_doan = np.asarray(y_du_doan)
+        eps = max(1e-15, float(np.finfo(y_du_doan.dtype).eps)) if y_du_doan.dtype.kind == 'f' else 1e-15
+        y_du_doan = np.clip(y_du_doan, eps, 1 - eps)
+        return -np.mean(y_thuc * np.log(y_du_doan) + (1 - y_thuc) * np.log(1 - y_du_doan))
+
+    def du_doan(self, X: np.ndarray) -> np.ndarray:
+        """Dự đoán cho dữ liệu mới"""
+        activations, _ = self.lan_truyen_thuan(X)
+        return activations[-1].flatten()
+
+    def du_doan_lop(self, X: np.ndarray, nguong: float = 0.5) -> np.ndarray:
+        """Dự đoán lớp (0 hoặc 1)"""
+        y_prob = self.du_doan(X)
+        return (y_prob >= nguong).astype(int)
+
+    def huan_luyen(self, X: np.ndarray, y: np.ndarray, so_epoch: int = 1000,
+                  X_val: np.ndarray = None, y_val: np.ndarray = None, in_qua_trinh: bool = True):
+        """
+        Huấn luyện mạng neuron
+
+        Args:
+            X: Dữ liệu huấn luyện
+            y: Nhãn huấn luyện
+            so_epoch: Số epoch
+            X_val: Dữ liệu validation (tùy chọn)
+            y_val: Nhãn validation (tùy chọn)
+            in_qua_trinh: In thông tin quá trình
+        """
+        if in_qua_trinh:
+            print(f"Bắt đầu huấn luyện mạng neuron với {so_epoch} epoch")
+            print(f"Kiến trúc mạng: {' -> '.join(map(str, self.kich_thuoc_cac_lop))}")
+
+        for epoch in range(so_epoch):
+            # Lan truyền ngược và cập nhật
+            grad_w, grad_b = self.lan_truyen_nguoc(X, y)
+            self.cap_nhat_tham_so(grad_w, grad_b)
+
+            # Tính loss và accuracy
+            if epoch % self.chu_ky_ghi == 0:
+                self._ghi_lich_su(epoch, X, y, X_val, y_val, in_qua_trinh)
+
+    def _ghi_lich_su(self, epoch, X, y, X_val, y_val, in_qua_trinh):
+        y_pred = self.du_doan(X)
+        loss = self.tinh_loss(y, y_pred)
+        accuracy = np.mean((y_pred >= 0.5) == y)
+
+        self.lich_su_loss.append(loss)
+        self.lich_su_accuracy.append(accuracy)
+
+        if in_qua_trinh:
+            thong_tin = f"Epoch {epoch:4d}: Loss = {loss:.4f}, Accuracy = {accuracy:.4f}"
+
+            # Thêm thông tin validation nếu có
+            if X_val is not None and y_val is not None:
+                y_val_pred = self.du_doan(X_val)
+                val_loss = self.tinh_loss(y_val, y_val_pred)
+                val_accuracy = np.mean((y_val_pred >= 0.5) == y_val)
+                thong_tin += f", Val_Loss = {val_loss:.4f}, Val_Acc = {val_accuracy:.4f}"
+
+            print(thong_tin)
+
+    def ve_bieu_do_huan_luyen(self):
+        """Vẽ biểu đồ quá trình huấn luyện"""
+        import matplotlib.pyplot as plt
+
+        if not self.lich_su_loss:
+            print("Chưa có dữ liệu huấn luyện để vẽ biểu đồ")
+            return
+
+        fig, axes = plt.subplots(1, 2, figsize=(15, 5))
+
+        epochs = range(0, len(self.lich_su_loss) * self.chu_ky_ghi, self.chu_ky_ghi)
+
+        # Biểu đồ Loss
+        axes[0].plot(epochs, self.lich_su_loss, 'b-', linewidth=2)
+        axes[0].set_title('Quá trình giảm Loss')
+        axes[0].set_xlabel('Epoch')
+        axes[0].set_ylabel('Loss')
+        axes[0].grid(True, alpha=0.3)
+
+        # Biểu đồ Accuracy
+        axes[1].plot(epochs, self.lich_su_accuracy, 'g-', linewidth=2)
+        axes[1].set_title('Quá trình tăng Accuracy')
+        axes[1].set_xlabel('Epoch')
+        axes[1].set_ylabel('Accuracy')
+        axes[1].grid(True, alpha=0.3)
+
+        plt.tight_layout()
+        plt.show()
+
+    def in_thong_tin_mang(self):
+        """In thông tin chi tiết về mạng"""
+        print(f"=== THÔNG TIN MẠNG NEURON ===")
+        print(f"Kiến trúc: {' -> '.join(map(str, self.kich_thuoc_cac_lop))}")
+        print(f"Số lớp: {self.so_lop}")
+        print(f"Tổng số tham số: {sum(w.size for w in self.trong_so) + sum(b.size for b in self.bias)}")
+
+        for i, (w, b) in enumerate(zip(self.trong_so, self.bias)):
+            print(f"Lớp {i+1}: Trọng số {w.shape}, Bias {b.shape}")
+
+
+class BoDem:
+    """
+    Bộ đệm cấp phát sẵn cho một kích thước batch:
+    kích hoạt từng lớp, delta, đạo hàm và gradient
+    """
+
+    def __init__(self, kich_thuoc_cac_lop: List[int], kich_thuoc_batch: int, dtype):
+        self.kich_thuoc_batch = kich_thuoc_batch
+        self.activations = [np.empty((kich_thuoc_batch, n), dtype=dtype) for n in kich_thuoc_cac_lop]
+        self.y = np.empty((kich_thuoc_batch, 1), dtype=dtype)
+        # delta[i], dao_ham[i] cùng shape với activations[i + 1]
+        self.delta = [np.empty((kich_thuoc_batch, n), dtype=dtype) for n in kich_thuoc_cac_lop[1:]]
+        self.dao_ham = [np.empty((kich_thuoc_batch, n), dtype=dtype) for n in kich_thuoc_cac_lop[1:]]
+        self.grad_w = [np.empty((n_in, n_out), dtype=dtype)
+                       for n_in, n_out in zip(kich_thuoc_cac_lop[:-1], kich_thuoc_cac_lop[1:])]
+        self.grad_b = [np.empty((1, n), dtype=dtype) for n in kich_thuoc_cac_lop[1:]]
+
+
+class MangNeuronMiniBatch(MangNeuronNhanTao):
+    """
+    MLP huấn luyện theo mini-batch xáo trộn, float32, dùng lại bộ đệm giữa các batch.
+
+    Cùng giao diện với MangNeuronNhanTao (huan_luyen, du_doan, du_doan_lop, ...).
+    Huấn luyện và dự đoán dùng chung bộ đệm của đối tượng nên không an toàn khi gọi
+    song song từ nhiều thread; mỗi thread cần một bản sao mô hình riêng.
+    """
+
+    def __init__(self, kich_thuoc_cac_lop: List[int], ham_kich_hoat: str = 'sigmoid',
+                 he_so_hoc: float = 0.01, kich_thuoc_batch: int = 256,
+                 dtype=np.float32, kich_thuoc_batch_du_doan: int = 65536):
+        """
+        Args:
+            kich_thuoc_batch: Số mẫu mỗi mini-batch khi huấn luyện
+            dtype: Kiểu số thực của tham số và bộ đệm (mặc định float32)
+            kich_thuoc_batch_du_doan: Số mẫu xử lý mỗi lần khi dự đoán
+        """
+        self.dtype = np.dtype(dtype)
+        self.kich_thuoc_batch = kich_thuoc_batch
+        self.kich_thuoc_batch_du_doan = kich_thuoc_batch_du_doan
+        self._bo_dem_huan_luyen: Optional[BoDem] = None
+        self._bo_dem_du_doan: Optional[BoDem] = None
+        super().__init__(kich_thuoc_cac_lop, ham_kich_hoat, he_so_hoc)
+
+    def thiet_lap_ham_kich_hoat(self, ten_ham: str):
+        super().thiet_lap_ham_kich_hoat(ten_ham)
+        self.kich_hoat_tai_cho = getattr(HamKichHoatTaiCho, ten_ham)
+        self.dao_ham_tai_cho = getattr(HamKichHoatTaiCho, f'{ten_ham}_dao_ham')
+
+    def khoi_tao_tham_so(self):
+        super().khoi_tao_tham_so()
+        self.trong_so = [w.astype(self.dtype) for w in self.trong_so]
+        self.bias = [b.astype(self.dtype) for b in self.bias]
+
+    def _dam_bao_bo_dem(self, bo_dem: Optional[BoDem], kich_thuoc_batch: int) -> BoDem:
+        """Dùng lại bo_dem nếu đủ chỗ cho kich_thuoc_batch mẫu, nếu không thì cấp phát bộ đệm mới"""
+        if bo_dem is None or bo_dem.kich_thuoc_batch < kich_thuoc_batch:
+            bo_dem = BoDem(self.kich_thuoc_cac_lop, kich_thuoc_batch, self.dtype)
+        return bo_dem
+
+    def _lan_truyen_thuan_bo_dem(self, bo_dem: BoDem, m: int) -> List[np.ndarray]:
+        """
+        Lan truyền thuận cho m mẫu đầu tiên đã nạp vào bo_dem.activations[0].
+        Kết quả ghi thẳng vào bộ đệm, không cấp phát mảng mới.
+        """
+        activations = [a[:m] for a in bo_dem.activations]
+        for i in range(self.so_lop - 1):
+            z = activations[i + 1]
+            np.matmul(activations[i], self.trong_so[i], out=z)
+            z += self.bias[i]
+            if i == self.so_lop - 2:
+                HamKichHoatTaiCho.sigmoid(z)
+            else:
+                self.kich_hoat_tai_cho(z, bo_dem.dao_ham[i][:m])
+        return activations
+
+    def _buoc_huan_luyen(self, bo_dem: BoDem, m: int):
+        """Một bước gradient descent trên m mẫu trong bộ đệm"""
+        activations = self._lan_truyen_thuan_bo_dem(bo_dem, m)
+        buoc = self.dtype.type(self.he_so_hoc / m)
+
+        delta = bo_dem.delta[-1][:m]
+        np.subtract(activations[-1], bo_dem.y[:m], out=delta)
+
+        for i in range(self.so_lop - 2, -1, -1):
+            grad_w = bo_dem.grad_w[i]
+            grad_b = bo_dem.grad_b[i]
+            np.matmul(activations[i].T, delta, out=grad_w)
+            np.add.reduce(delta, axis=0, keepdims=True, out=grad_b)
+
+            # delta của lớp trước phải dùng trọng số cũ, nên tính trước khi cập nhật
+            if i > 0:
+                delta_truoc = bo_dem.delta[i - 1][:m]
+                dao_ham = bo_dem.dao_ham[i - 1][:m]
+                np.matmul(delta, self.trong_so[i].T, out=delta_truoc)
+                self.dao_ham_tai_cho(activations[i], dao_ham)
+                delta_truoc *= dao_ham
+
+            grad_w *= buoc
+            grad_b *= buoc
+            self.trong_so[i] -= grad_w
+            self.bias[i] -= grad_b
+
+            if i > 0:
+                delta = delta_truoc
+
+    def du_doan(self, X: np.ndarray) -> np.ndarray:
+        """
+        Dự đoán theo từng khối kich_thuoc_batch_du_doan mẫu. Chỉ giữ một bộ đệm dự đoán,
+        lớn dần tới tối đa kich_thuoc_batch_du_doan mẫu; không gọi song song từ nhiều thread.
+        """
+        n = len(X)
+        ket_qua = np.empty(n, dtype=self.dtype)
+        kich_thuoc = min(self.kich_thuoc_batch_du_doan, max(n, 1))
+        self._bo_dem_du_doan = bo_dem = self._dam_bao_bo_dem(self._bo_dem_du_doan, kich_thuoc)
+        for dau in range(0, n, kich_thuoc):
+            cuoi = min(dau + kich_thuoc, n)
+            m = cuoi - dau
+            bo_dem.activations[0][:m] = X[dau:cuoi]
+            activations = self._lan_truyen_thuan_bo_dem(bo_dem, m)
+            ket_qua[dau:cuoi] = activations[-1][:, 0]
+        return ket_qua
+
+    def huan_luyen(self, X: np.ndarray, y: np.ndarray, so_epoch: int = 100,
+                  X_val: np.ndarray = None, y_val: np.ndarray = None, in_qua_trinh: bool = True,
+                  chu_ky_ghi: int = 10, random_state: int = None):
+        """
+        Huấn luyện theo mini-batch; mỗi epoch xáo trộn thứ tự mẫu
+
+        Args:
+            chu_ky_ghi: Cứ bao nhiêu epoch thì tính loss/accuracy trên toàn bộ X
+            random_state: Seed cho việc xáo trộn
+        """
+        if in_qua_trinh:
+            print(f"Bắt đầu huấn luyện mạng neuron với {so_epoch} epoch, batch {self.kich_thuoc_batch}")
+            print(f"Kiến trúc mạng: {' -> '.join(map(str, self.kich_thuoc_cac_lop))}")
+
+        self.chu_ky_ghi = chu_ky_ghi
+        X = np.ascontiguousarray(X, dtype=self.dtype)
+        y_cot = np.ascontiguousarray(y, dtype=self.dtype).reshape(-1, 1)
+        n = len(X)
+        kich_thuoc = min(self.kich_thuoc_batch, n)
+        self._bo_dem_huan_luyen = bo_dem = self._dam_bao_bo_dem(self._bo_dem_huan_luyen, kich_thuoc)
+        rng = np.random.default_rng(random_state)
+        thu_tu = np.arange(n)
+
+        for epoch in range(so_epoch):
+            rng.shuffle(thu_tu)
+            for dau in range(0, n, kich_thuoc):
+                chi_so = thu_tu[dau:dau + kich_thuoc]
+                m = len(chi_so)
+                # Gom mẫu thẳng vào bộ đệm, không tạo mảng trung gian
+                np.take(X, chi_so, axis=0, out=bo_dem.activations[0][:m])
+                np.take(y_cot, chi_so, axis=0, out=bo_dem.y[:m])
+                self._buoc_huan_luyen(bo_dem, m)
+
+            if epoch % chu_ky_ghi == 0:
+                self._ghi_lich_su(epoch, X, y, X_val, y_val, in_qua_trinh)
@@ -0,0 +1,225 @@
+import asyncio
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+import socketio
+
+
+class ServerSubscription:
+    """Một kết nối WebSocket tới một Face Detection Server, tự kết nối lại khi mất kết nối"""
+
+    def __init__(self, server_url, queue, reconnection_delay=2, reconnection_delay_max=30, verbose=True):
+        self.server_url = server_url
+        self.queue = queue
+        self.reconnection_delay = reconnection_delay
+        self.reconnection_delay_max = reconnection_delay_max
+        self.verbose = verbose
+        # reconnection_attempts=0: thử kết nối lại vô hạn, mỗi server có backoff riêng
+        self.sio = socketio.AsyncClient(reconnection=True, reconnection_attempts=0,
+                                        reconnection_delay=reconnection_delay,
+                                        reconnection_delay_max=reconnection_delay_max)
+        self.connected = False
+        self.stopping = False
+        self.events_received = 0
+        self.events_dropped = 0
+        self.setup_socket_events()
+
+    def log(self, message):
+        if self.verbose:
+            print(f"[{self.server_url}] {message}")
+
+    def setup_socket_events(self):
+        """Thiết lập các event handlers cho WebSocket"""
+
+        @self.sio.event
+        async def connect():
+            self.connected = True
+            self.log("✅ Đã kết nối")
+
+        @self.sio.event
+        async def disconnect():
+            self.connected = False
+            if self.stopping:
+                self.log("👋 Đã ngắt kết nối")
+            else:
+                self.log("❌ Mất kết nối, đang chờ kết nối lại...")
+
+        @self.sio.event
+        async def connect_error(data):
+            self.log(f"❌ Lỗi kết nối WebSocket: {data}")
+
+        @self.sio.event
+        async def face_detected(data):
+            self.events_received += 1
+            self.publish({'source': self.server_url, 'data': data})
+
+    def publish(self, event):
+        """Đưa event vào hàng đợi chung; khi hàng đợi đầy thì bỏ event cũ nhất"""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            try:
+                self.queue.get_nowait()
+                self.events_dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+            self.queue.put_nowait(event)
+
+    async def run(self):
+        """Kết nối tới server; lần kết nối đầu tiên được thử lại với backoff cho tới khi thành công"""
+        delay = self.reconnection_delay
+        while not self.stopping:
+            try:
+                self.log("🔗 Đang kết nối WebSocket...")
+                await self.sio.connect(self.server_url, wait_timeout=10)
+                break
+            except socketio.exceptions.ConnectionError as e:
+                self.log(f"⏱️ Kết nối thất bại ({e}), thử lại sau {delay}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.reconnection_delay_max)
+
+        # Sau khi đã kết nối, socketio tự xử lý việc kết nối lại
+        await self.sio.wait()
+
+    async def close(self):
+        """Ngắt kết nối và đóng aiohttp session của engine.io (kể cả khi chưa từng kết nối được)"""
+        self.stopping = True
+        eio = self.sio.eio
+        try:
+            if self.sio.connected:
+                await self.sio.disconnect()
+            await eio.disconnect(abort=True)
+        finally:
+            http = getattr(eio, 'http', None)
+            if http is not None and not http.closed and not getattr(eio, 'external_http', False):
+                await http.close()
+
+
+class MultiServerFaceClient:
+    """Client asyncio theo dõi nhiều Face Detection Server cùng lúc.
+
+    Các event `face_detected` của mọi server được gộp thành một async iterator,
+    mỗi phần tử có dạng {'source': server_url, 'data': event_data}.
+    """
+
+    def __init__(self, server_urls, max_queue_size=10000, verbose=True):
+        self.server_urls = list(dict.fromkeys(server_urls))
+        self.verbose = verbose
+        self.queue = asyncio.Queue(maxsize=max_queue_size)
+        self.subscriptions = {url: ServerSubscription(url, self.queue, verbose=verbose)
+                              for url in self.server_urls}
+        self.tasks = []
+
+    async def start(self):
+        """Khởi động kết nối tới tất cả server"""
+        for subscription in self.subscriptions.values():
+            self.tasks.append(asyncio.create_task(subscription.run()))
+
+    async def stop(self):
+        """Ngắt kết nối tất cả server"""
+        # Đóng kết nối trước khi hủy task run(): hủy giữa chừng làm engine.io kẹt ở trạng thái disconnecting
+        await asyncio.gather(*(s.close() for s in self.subscriptions.values()),
+                             return_exceptions=True)
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.queue.get()
+
+    def get_status(self):
+        """Trạng thái kết nối và số event của từng server"""
+        return {url: {'connected': s.connected,
+                      'events_received': s.events_received,
+                      'events_dropped': s.events_dropped}
+                for url, s in self.subscriptions.items()}
+
+
+def load_server_urls(args):
+    """Lấy danh sách server từ tham số dòng lệnh, file và biến môi trường SERVER_URLS"""
+    urls = list(args.servers)
+    if args.servers_file:
+        with open(args.servers_file, 'r', encoding='utf-8') as f:
+            urls.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    if not urls and os.environ.get('SERVER_URLS'):
+        urls = [u.strip() for u in os.environ['SERVER_URLS'].split(',') if u.strip()]
+    if not urls:
+        urls = [os.environ.get('SERVER_URL', 'http://localhost:8080')]
+    return urls
+
+
+async def run_aggregator(args):
+    server_urls = load_server_urls(args)
+    print(f"🎯 Face Detection Aggregator - theo dõi {len(server_urls)} server")
+
+    log_file = open(args.log_file, 'a', encoding='utf-8') if args.log_file else None
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + args.duration if args.duration else None
+
+    try:
+        async with MultiServerFaceClient(server_urls, verbose=not args.quiet) as client:
+            while True:
+                timeout = None if deadline is None else deadline - loop.time()
+                if timeout is not None and timeout <= 0:
+                    break
+                try:
+                    event = await asyncio.wait_for(client.__anext__(), timeout)
+                except asyncio.TimeoutError:
+                    break
+
+                data = event['data']
+                log_entry = {
+                    'timestamp': datetime.now().isoformat(),
+                    'event': 'face_detected',
+                    'source': event['source'],
+                    'server_timestamp': data.get('timestamp'),
+                    'faces_count': data.get('faces_count'),
+                    'faces': data.get('faces')
+                }
+                if log_file:
+                    log_file.write(json.dumps(log_entry, ensure_ascii=False) + '\n')
+                if not args.quiet:
+                    print(f"🎯 {event['source']}: {log_entry['faces_count']} khuôn mặt lúc {log_entry['server_timestamp']}")
+
+            print("\n📊 THỐNG KÊ:")
+            for url, status in client.get_status().items():
+                print(f"   {url}: {status['events_received']} events, "
+                      f"{status['events_dropped']} bị bỏ, "
+                      f"{'🟢' if status['connected'] else '🔴'}")
+    finally:
+        if log_file:
+            log_file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gộp event face_detected từ nhiều Face Detection Server")
+    parser.add_argument('servers', nargs='*', help="URL các server, ví dụ http://cam1:8080")
+    parser.add_argument('--servers-file', help="File chứa danh sách URL, mỗi dòng một server")
+    parser.add_argument('--log-file', default='face_detection_log.json', help="File JSONL để ghi event ('' để tắt)")
+    parser.add_argument('--duration', type=float, default=0, help="Thời gian chạy (giây), 0 = chạy mãi")
+    parser.add_argument('--quiet', action='store_true', help="Không in từng event")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run_aggregator(args))
+    except KeyboardInterrupt:
+        print("\n👋 Đã thoát!")
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
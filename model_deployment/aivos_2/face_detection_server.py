@@ -1,18 +1,42 @@
+import time
+# Mốc thời gian cold start: trước khi import Flask/OpenCV
+PROCESS_T0 = time.time()
+
 from flask import Flask, Response, jsonify, request
 from flask_socketio import SocketIO, emit
 import cv2
 import json
 import threading
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 from datetime import datetime
 import base64
 import numpy as np
 import socket
 import sys
+import os
+import atexit
+import signal
+
+from frame_bus import FrameBusWriter
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'face_detection_secret'
 
+# Shared-memory frame bus cho các process khác trên cùng máy (tắt nếu không đặt tên)
+FRAME_BUS_NAME = os.environ.get('FRAME_BUS_NAME')
+FRAME_BUS_SLOTS = int(os.environ.get('FRAME_BUS_SLOTS', 8))
+
+# Camera: CAMERA_INDEX cố định thiết bị; nếu không, dò song song và lưu thiết bị dùng được vào file cấu hình
+CAMERA_INDEX = os.environ.get('CAMERA_INDEX')
+CAMERA_PROBE_INDICES = int(os.environ.get('CAMERA_PROBE_INDICES', 3))
+CAMERA_PROBE_TIMEOUT = float(os.environ.get('CAMERA_PROBE_TIMEOUT', 5))
+CAMERA_CONFIG_PATH = os.environ.get('CAMERA_CONFIG_PATH', os.path.join('config', 'camera.json'))
+# Phát lại file video (hoặc URL) thay cho camera, lặp vô hạn theo FPS của video - dùng cho load test
+CAMERA_SOURCE = os.environ.get('CAMERA_SOURCE')
+CAMERA_SOURCE_FPS = float(os.environ.get('CAMERA_SOURCE_FPS', 0))
+# Load test: cứ N frame thì báo một khuôn mặt giả ở giữa frame để có event face_detected (0 = tắt)
+SYNTHETIC_FACE_EVERY = int(os.environ.get('SYNTHETIC_FACE_EVERY', 0))
+
 def find_free_port(start_port=8080):
     """Find a free port starting from start_port"""
     port = start_port
@@ -28,92 +52,273 @@ def find_free_port(start_port=8080):
             sock.close()
     raise RuntimeError("No free ports found")
 
-# Try to find a free port
-try:
-    PORT = find_free_port(8080)
-    print(f"Using port: {PORT}")
-except:
-    PORT = 8080
-    print(f"Using default port: {PORT}")
+# SERVER_PORT cố định port; nếu không đặt, tìm port trống khi chạy trực tiếp (xem __main__)
+PORT = int(os.environ.get('SERVER_PORT', 8080))
+
+# Log chi tiết của SocketIO/EngineIO rất nhiều và chậm, chỉ bật khi cần debug
+SOCKETIO_LOG = os.environ.get('SOCKETIO_LOG', 'false').lower() in ('1', 'true', 'yes')
 
 # Initialize SocketIO with error handling
 try:
-    socketio = SocketIO(app, cors_allowed_origins="*", logger=True, engineio_logger=True)
+    socketio = SocketIO(app, cors_allowed_origins="*", logger=SOCKETIO_LOG, engineio_logger=SOCKETIO_LOG)
 except Exception as e:
     print(f"Error initializing SocketIO: {e}")
     socketio = SocketIO(app, cors_allowed_origins="*")
 
+def probe_camera(index):
+    """Mở camera index và đọc thử một frame; trả về VideoCapture hoặc None"""
+    try:
+        camera = cv2.VideoCapture(index)
+        if camera.isOpened():
+            ret, _ = camera.read()
+            if ret:
+                return camera
+        camera.release()
+    except Exception as e:
+        print(f"Error probing camera {index}: {e}")
+    return None
+
+
+def release_unused_camera(future, chosen):
+    """Giải phóng camera được dò thành công nhưng không được chọn (kể cả khi xong sau timeout)"""
+    try:
+        camera = future.result()
+    except Exception:
+        return
+    if camera is not None and camera is not chosen:
+        camera.release()
+
+
 class FaceDetectionServer:
     def __init__(self):
         self.camera = None
-        # Check if OpenCV cascade file exists
-        cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        try:
-            self.face_cascade = cv2.CascadeClassifier(cascade_path)
-            if self.face_cascade.empty():
-                print("Warning: Could not load face cascade classifier")
-        except Exception as e:
-            print(f"Error loading face cascade: {e}")
-            self.face_cascade = None
-            
+        self.camera_index = None
+        self.camera_lock = threading.Lock()
+        # start_camera/stop_camera: không để hai request /start mở hai camera và hai capture thread.
+        # RLock vì handle_sigterm có thể chạy lồng trong stop_camera khi nhận SIGTERM lần thứ hai
+        self.state_lock = threading.RLock()
+        self.frame_interval = 0
+        self.next_frame_time = 0
+        self.frames_processed = 0
+        # Haar cascade được nạp trong background (xem start_background_loading) hoặc khi cần lần đầu
+        self._face_cascade = None
+        self._cascade_lock = threading.Lock()
+        self.cascade_ready = threading.Event()
+
         self.is_running = False
         self.last_detection = None
         self.detection_events = []
-        
-    def start_camera(self):
-        """Khởi động camera"""
+        self.frame_bus = None
+        self.capture_thread = None
+        self.startup_metrics = {
+            'ready_ms': None,
+            'first_request_ms': None,
+            'cascade_load_ms': None,
+            'camera_start_ms': None,
+            'camera_probe': None
+        }
+
+    def start_background_loading(self):
+        """Nạp các tài nguyên nặng trong background để server nhận request ngay"""
+        threading.Thread(target=self.load_cascade, daemon=True).start()
+
+    def load_cascade(self):
+        """Nạp Haar cascade (chỉ một lần)"""
+        with self._cascade_lock:
+            if self.cascade_ready.is_set():
+                return
+            start = time.perf_counter()
+            # Check if OpenCV cascade file exists
+            cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+            try:
+                self._face_cascade = cv2.CascadeClassifier(cascade_path)
+                if self._face_cascade.empty():
+                    print("Warning: Could not load face cascade classifier")
+            except Exception as e:
+                print(f"Error loading face cascade: {e}")
+                self._face_cascade = None
+            self.startup_metrics['cascade_load_ms'] = round((time.perf_counter() - start) * 1000, 1)
+            self.cascade_ready.set()
+
+    @property
+    def face_cascade(self):
+        if not self.cascade_ready.is_set():
+            self.load_cascade()
+        return self._face_cascade
+
+    def load_camera_config(self):
         try:
-            # Try different camera indices
-            for i in range(3):
-                try:
-                    self.camera = cv2.VideoCapture(i)
-                    if self.camera.isOpened():
-                        print(f"Camera {i} opened successfully")
-                        break
-                    else:
-                        self.camera.release()
-                except:
-                    continue
-            else:
-                print("No camera found")
-                return False
-                
-            self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            self.camera.set(cv2.CAP_PROP_FPS, 30)
+            with open(CAMERA_CONFIG_PATH, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_camera_config(self, index):
+        try:
+            os.makedirs(os.path.dirname(CAMERA_CONFIG_PATH) or '.', exist_ok=True)
+            with open(CAMERA_CONFIG_PATH, 'w', encoding='utf-8') as f:
+                json.dump({'camera_index': index, 'updated_at': datetime.now().isoformat()}, f)
+        except OSError as e:
+            print(f"Warning: Could not save camera config: {e}")
+
+    def probe_cameras(self, indices):
+        """
+        Dò song song các camera, mỗi thiết bị một thread; trả về (index, camera) có index nhỏ nhất dùng được.
+        Chỉ chọn khi mọi index nhỏ hơn đã dò xong, để lần chạy nào cũng chọn cùng một thiết bị.
+        """
+        if not indices:
+            return None, None
+        pool = ThreadPoolExecutor(max_workers=len(indices))
+        futures = {i: pool.submit(probe_camera, i) for i in sorted(indices)}
+
+        def decided():
+            # Đã biết kết quả khi mọi index đứng trước thiết bị dùng được đầu tiên đều dò xong
+            for future in futures.values():
+                if not future.done():
+                    return False
+                if future.result() is not None:
+                    return True
+            return True
+
+        index, camera = None, None
+        try:
+            for _ in as_completed(futures.values(), timeout=CAMERA_PROBE_TIMEOUT):
+                if decided():
+                    break
+        except FuturesTimeoutError:
+            print(f"Camera probe timed out after {CAMERA_PROBE_TIMEOUT}s")
+        # Khi hết timeout, các index còn treo bị bỏ qua
+        for i, future in futures.items():
+            if future.done() and future.result() is not None:
+                index, camera = i, future.result()
+                break
+        for future in futures.values():
+            future.add_done_callback(lambda f: release_unused_camera(f, camera))
+        # Không chờ các driver đang treo
+        pool.shutdown(wait=False)
+        return index, camera
+
+    def open_camera(self):
+        """
+        Tìm camera: CAMERA_SOURCE (file video) hoặc CAMERA_INDEX nếu có, nếu không thử thiết bị đã lưu trong CAMERA_CONFIG_PATH,
+        cuối cùng dò song song các index còn lại.
+        """
+        if CAMERA_SOURCE:
+            self.startup_metrics['camera_probe'] = 'source'
+            camera = cv2.VideoCapture(CAMERA_SOURCE)
+            if not camera.isOpened():
+                camera.release()
+                return None, None
+            fps = CAMERA_SOURCE_FPS or camera.get(cv2.CAP_PROP_FPS) or 30
+            self.frame_interval = 1.0 / fps
+            return CAMERA_SOURCE, camera
+
+        if CAMERA_INDEX is not None:
+            self.startup_metrics['camera_probe'] = 'env'
+            return self.probe_cameras([int(CAMERA_INDEX)])
+
+        cached = self.load_camera_config().get('camera_index')
+        if cached is not None:
+            index, camera = self.probe_cameras([cached])
+            if camera is not None:
+                self.startup_metrics['camera_probe'] = 'config'
+                return index, camera
+            print(f"Cached camera {cached} is not available, probing all devices")
+
+        self.startup_metrics['camera_probe'] = 'parallel'
+        index, camera = self.probe_cameras([i for i in range(CAMERA_PROBE_INDICES) if i != cached])
+        if camera is not None:
+            self.save_camera_config(index)
+        return index, camera
+
+    def start_camera(self):
+        """Khởi động camera; nếu camera đang chạy thì không mở thêm camera hay capture thread"""
+        with self.state_lock:
+            if self.is_running:
+                print("Camera đang chạy, bỏ qua yêu cầu khởi động")
+                return True
+            if self.capture_thread and self.capture_thread.is_alive():
+                # capture_loop của lần chạy trước chưa thoát: frame bus chỉ cho phép một thread ghi
+                self.capture_thread.join(timeout=2)
+                if self.capture_thread.is_alive():
+                    print("Capture thread cũ chưa dừng, thử lại sau")
+                    return False
+            self.capture_thread = None
+            try:
+                start = time.perf_counter()
+                self.camera_index, self.camera = self.open_camera()
+                if self.camera is None:
+                    print("No camera found")
+                    return False
+                print(f"Camera {self.camera_index} opened successfully")
+
+                self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+                self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+                self.camera.set(cv2.CAP_PROP_FPS, 30)
             
-            # Test if camera is working
-            ret, frame = self.camera.read()
-            if not ret:
-                print("Cannot read from camera")
-                self.camera.release()
-                return False
+                # Test if camera is working
+                ret, frame = self.read_frame()
+                if not ret:
+                    print("Cannot read from camera")
+                    self.camera.release()
+                    return False
                 
-            self.is_running = True
-            print("Camera started successfully")
-            return True
+                self.is_running = True
+                self.startup_metrics['camera_start_ms'] = round((time.perf_counter() - start) * 1000, 1)
+                if FRAME_BUS_NAME:
+                    # Một thread duy nhất đọc camera và ghi vào frame bus; video_feed đọc lại từ bus
+                    self.capture_thread = threading.Thread(target=self.capture_loop, daemon=True)
+                    self.capture_thread.start()
+                print("Camera started successfully")
+                return True
             
-        except Exception as e:
-            print(f"Lỗi khởi động camera: {e}")
-            if self.camera:
-                self.camera.release()
-            return False
+            except Exception as e:
+                print(f"Lỗi khởi động camera: {e}")
+                if self.camera:
+                    self.camera.release()
+                return False
     
+    def read_frame(self):
+        """Đọc một frame; với CAMERA_SOURCE thì tua lại khi hết video và giữ đúng FPS"""
+        with self.camera_lock:
+            success, frame = self.camera.read()
+            if not success and CAMERA_SOURCE:
+                self.camera.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                success, frame = self.camera.read()
+            if self.frame_interval:
+                now = time.monotonic()
+                self.next_frame_time = max(self.next_frame_time + self.frame_interval, now)
+                time.sleep(self.next_frame_time - now)
+            return success, frame
+
     def stop_camera(self):
         """Dừng camera"""
-        self.is_running = False
-        if self.camera:
-            self.camera.release()
-            print("Camera stopped")
+        with self.state_lock:
+            self.is_running = False
+            if self.capture_thread:
+                self.capture_thread.join(timeout=2)
+                # Giữ lại thread chưa thoát để start_camera chờ nó thay vì mở thêm một writer
+                if not self.capture_thread.is_alive():
+                    self.capture_thread = None
+            if self.camera:
+                self.camera.release()
+                print("Camera stopped")
             
     def detect_faces(self, frame):
         """Nhận diện khuôn mặt trong frame"""
-        if self.face_cascade is None:
+        self.frames_processed += 1
+        synthetic = SYNTHETIC_FACE_EVERY and self.frames_processed % SYNTHETIC_FACE_EVERY == 0
+        if self.face_cascade is None and not synthetic:
             return frame, []
             
         try:
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(gray, 1.1, 4)
+            faces = []
+            if self.face_cascade is not None:
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                faces = self.face_cascade.detectMultiScale(gray, 1.1, 4)
+            if synthetic and len(faces) == 0:
+                height, width = frame.shape[:2]
+                faces = np.array([[width // 2 - 50, height // 2 - 50, 100, 100]], dtype=np.int32)
             
             # Vẽ khung quanh khuôn mặt
             for (x, y, w, h) in faces:
@@ -124,11 +329,80 @@ class FaceDetectionServer:
             print(f"Error in face detection: {e}")
             return frame, []
     
+    def open_frame_bus(self, shape):
+        """Tạo frame bus theo kích thước frame thực tế của camera"""
+        if self.frame_bus is not None and self.frame_bus.shape == shape:
+            return
+        if self.frame_bus is not None:
+            self.frame_bus.unlink()
+        try:
+            self.frame_bus = FrameBusWriter(FRAME_BUS_NAME, shape, slots=FRAME_BUS_SLOTS)
+            print(f"Frame bus '{FRAME_BUS_NAME}' ready: {FRAME_BUS_SLOTS} slots of {shape}")
+        except Exception as e:
+            print(f"Error creating frame bus: {e}")
+            self.frame_bus = None
+
+    def close_frame_bus(self):
+        if self.frame_bus is not None:
+            self.frame_bus.unlink()
+            self.frame_bus = None
+
+    def capture_loop(self):
+        """Đọc camera, ghi frame gốc và kết quả nhận diện vào frame bus (chế độ FRAME_BUS_NAME)"""
+        while self.is_running and self.camera and self.camera.isOpened():
+            try:
+                success, frame = self.read_frame()
+                if not success:
+                    print("Failed to read frame")
+                    break
+
+                self.open_frame_bus(frame.shape)
+                if self.frame_bus is None:
+                    break
+                # Copy frame gốc vào bus trước khi detect_faces vẽ khung lên frame
+                self.frame_bus.begin_write(frame)
+                _, faces = self.detect_faces(frame)
+                self.frame_bus.commit(faces)
+
+                if len(faces) > 0:
+                    self.handle_face_detection(faces)
+            except Exception as e:
+                print(f"Error in capture loop: {e}")
+                break
+        self.is_running = False
+
+    def generate_frames_from_bus(self):
+        """Generator cho video stream khi camera được đọc bởi capture_loop"""
+        last_seq = 0
+        while self.is_running:
+            if self.frame_bus is None:
+                time.sleep(0.01)
+                continue
+            view = self.frame_bus.wait_for(last_seq, timeout=1.0)
+            if view is None:
+                continue
+            last_seq = view.seq
+            copied = view.copy()
+            del view
+            if copied is None:
+                continue
+            frame, faces = copied
+
+            for (x, y, w, h) in faces:
+                cv2.rectangle(frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
+            ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
+            if ret:
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+
     def generate_frames(self):
         """Generator cho video stream"""
+        if FRAME_BUS_NAME:
+            yield from self.generate_frames_from_bus()
+            return
         while self.is_running and self.camera and self.camera.isOpened():
             try:
-                success, frame = self.camera.read()
+                success, frame = self.read_frame()
                 if not success:
                     print("Failed to read frame")
                     break
@@ -189,6 +463,19 @@ class FaceDetectionServer:
 
 # Khởi tạo detector
 detector = FaceDetectionServer()
+atexit.register(detector.close_frame_bus)
+
+def handle_sigterm(signum, frame):
+    """docker stop và Popen.terminate() gửi SIGTERM, khi đó atexit không chạy: tự giải phóng camera và frame bus"""
+    print("🛑 Nhận SIGTERM, đang dừng server...")
+    detector.stop_camera()
+    detector.close_frame_bus()
+    sys.exit(0)
+
+@app.before_request
+def record_first_request():
+    if detector.startup_metrics['first_request_ms'] is None:
+        detector.startup_metrics['first_request_ms'] = round((time.time() - PROCESS_T0) * 1000, 1)
 
 # Routes
 @app.route('/')
@@ -369,7 +656,16 @@ def get_status():
             'is_running': detector.is_running,
             'last_detection': detector.last_detection,
             'total_events': len(detector.detection_events),
-            'camera_available': detector.camera is not None and detector.camera.isOpened() if detector.camera else False
+            'camera_available': detector.camera is not None and detector.camera.isOpened() if detector.camera else False,
+            'frame_bus': {
+                'name': FRAME_BUS_NAME,
+                'latest_seq': detector.frame_bus.latest_seq,
+                'slots': detector.frame_bus.slots,
+                'shape': list(detector.frame_bus.shape)
+            } if detector.frame_bus else None,
+            'camera_index': detector.camera_index,
+            'cascade_loaded': detector.cascade_ready.is_set(),
+            'startup': detector.startup_metrics
         })
     except Exception as e:
         return jsonify({
@@ -401,6 +697,28 @@ def get_latest_detection():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def record_ready_when_listening(port, timeout=60):
+    """
+    Ghi ready_ms khi port đã nhận kết nối; socketio.run chặn luồng chính nên chờ trong thread riêng.
+    Trả về Event: set() để bỏ lần chờ này (ví dụ khi server chuyển sang port khác).
+    """
+    cancelled = threading.Event()
+
+    def wait_for_listen():
+        deadline = time.time() + timeout
+        while time.time() < deadline and not cancelled.is_set():
+            try:
+                with socket.create_connection(('localhost', port), timeout=0.5):
+                    if not cancelled.is_set():
+                        detector.startup_metrics['ready_ms'] = round((time.time() - PROCESS_T0) * 1000, 1)
+                        print(f"⏱️ Cold start: {detector.startup_metrics['ready_ms']} ms")
+                    return
+            except OSError:
+                pass
+            cancelled.wait(0.01)
+    threading.Thread(target=wait_for_listen, daemon=True).start()
+    return cancelled
+
 # WebSocket events
 @socketio.on('connect')
 def handle_connect():
@@ -420,6 +738,15 @@ def default_error_handler(e):
 
 if __name__ == '__main__':
     print("🎯 Face Detection Server đang khởi động...")
+    if 'SERVER_PORT' not in os.environ:
+        # Try to find a free port
+        try:
+            PORT = find_free_port(PORT)
+            print(f"Using port: {PORT}")
+        except RuntimeError:
+            print(f"Using default port: {PORT}")
+    detector.start_background_loading()
+    signal.signal(signal.SIGTERM, handle_sigterm)
     print("📹 Endpoints:")
     print(f"   - Video stream: http://localhost:{PORT}/video_feed")
     print(f"   - Start detection: POST http://localhost:{PORT}/start")
@@ -428,8 +755,11 @@ if __name__ == '__main__':
     print(f"   - Get events: GET http://localhost:{PORT}/events")
     print(f"   - Latest detection: GET http://localhost:{PORT}/latest_detection")
     print(f"   - WebSocket: ws://localhost:{PORT}")
+    if FRAME_BUS_NAME:
+        print(f"   - Frame bus (shared memory): {FRAME_BUS_NAME}")
     print(f"   - Demo page: http://localhost:{PORT}/")
     print(f"\n🚀 Server starting on port {PORT}...")
+    ready_probe = record_ready_when_listening(PORT)
     
     try:
         # Try running with different configurations
@@ -437,8 +767,12 @@ if __name__ == '__main__':
     except Exception as e:
         print(f"Error starting server: {e}")
         print("Trying alternative configuration...")
+        # Kết nối tới PORT lúc này có thể là process khác đang giữ port: bỏ kết quả đó, đo lại trên PORT+1
+        ready_probe.set()
+        detector.startup_metrics['ready_ms'] = None
+        record_ready_when_listening(PORT + 1)
         try:
-            socketio.run(app, host='localhost', port=PORT+1, debug=False)
+            socketio.run(app, host='localhost', port=PORT+1, debug=False, allow_unsafe_werkzeug=True)
         except Exception as e2:
             print(f"Failed to start server: {e2}")
             print("\n🔧 Troubleshooting tips:")
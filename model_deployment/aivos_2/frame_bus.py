@@ -0,0 +1,300 @@
+"""
+Frame bus dùng shared memory: Face Detection Server ghi frame gốc từ camera và kết quả
+nhận diện vào một ring buffer, các process khác trên cùng máy đọc trực tiếp (không copy,
+không encode JPEG, không mở thêm camera).
+
+Bố cục vùng nhớ:
+    header (64 byte): magic, version, số slot, height, width, channels, max_faces, latest_seq
+    slot i (căn 64 byte): seq (u64), timestamp (f64), faces_count (u32),
+                          faces (max_faces x 4 int32: x, y, w, h), frame (height x width x channels uint8)
+
+Chỉ có một process ghi. Mỗi slot dùng seq như một seqlock: khi bắt đầu ghi seq = 0, ghi xong
+seq = số thứ tự frame. Frame đọc ra là view trỏ thẳng vào shared memory, còn hợp lệ
+cho tới khi writer quay vòng lại slot đó (FrameView.is_valid() để kiểm tra).
+
+Đọc từ process khác:
+    reader = FrameBusReader('aivos_frames')
+    for view in reader.frames():
+        process(view.frame, view.faces)     # numpy arrays, không copy
+"""
+import argparse
+import struct
+import sys
+import time
+
+import numpy as np
+from multiprocessing import shared_memory
+
+MAGIC = b'FBUS'
+VERSION = 1
+HEADER_SIZE = 64
+_HEADER = struct.Struct('<4sIIIIII')    # magic, version, slots, height, width, channels, max_faces
+_LATEST_SEQ_OFFSET = 32
+_SLOT_META_SIZE = 24                    # seq, timestamp, faces_count (+ padding)
+_ALIGN = 64
+
+
+def _align(n):
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _slot_stride(height, width, channels, max_faces):
+    return _align(_SLOT_META_SIZE + max_faces * 16 + height * width * channels)
+
+
+def _attach(name):
+    """Mở vùng nhớ đã có mà không để resource_tracker của process đọc xóa nó khi thoát"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except Exception:
+        pass
+    return shm
+
+
+class FrameView:
+    """Một frame trong ring buffer; frame và faces là view của shared memory"""
+
+    __slots__ = ('bus', 'seq', 'slot', 'frame', 'faces', 'timestamp')
+
+    def __init__(self, bus, seq, slot, frame, faces, timestamp):
+        self.bus = bus
+        self.seq = seq
+        self.slot = slot
+        self.frame = frame
+        self.faces = faces
+        self.timestamp = timestamp
+
+    def is_valid(self):
+        """False nếu writer đã ghi đè slot này (dữ liệu đã đọc có thể bị lẫn frame mới)"""
+        return int(self.bus._slot_seq[self.slot]) == self.seq
+
+    def copy(self):
+        """Copy frame và faces ra bộ nhớ riêng; trả về None nếu slot đã bị ghi đè trong lúc copy"""
+        frame = self.frame.copy()
+        faces = self.faces.copy()
+        return (frame, faces) if self.is_valid() else None
+
+
+class _FrameBus:
+    """Phần chung của writer và reader: map các trường của header và slot thành numpy view"""
+
+    def _map(self, slots, height, width, channels, max_faces):
+        self.slots = slots
+        self.shape = (height, width, channels)
+        self.max_faces = max_faces
+        stride = _slot_stride(height, width, channels, max_faces)
+        buf = self.shm.buf
+
+        self._latest_seq = np.ndarray((1,), dtype=np.uint64, buffer=buf, offset=_LATEST_SEQ_OFFSET)
+        self._slot_seq = np.ndarray((slots,), dtype=np.uint64, buffer=buf,
+                                    offset=HEADER_SIZE, strides=(stride,))
+        self._slot_time = np.ndarray((slots,), dtype=np.float64, buffer=buf,
+                                     offset=HEADER_SIZE + 8, strides=(stride,))
+        self._slot_count = np.ndarray((slots,), dtype=np.uint32, buffer=buf,
+                                      offset=HEADER_SIZE + 16, strides=(stride,))
+        self._slot_faces = [np.ndarray((max_faces, 4), dtype=np.int32, buffer=buf,
+                                       offset=HEADER_SIZE + i * stride + _SLOT_META_SIZE)
+                            for i in range(slots)]
+        self._slot_frame = [np.ndarray(self.shape, dtype=np.uint8, buffer=buf,
+                                       offset=HEADER_SIZE + i * stride + _SLOT_META_SIZE + max_faces * 16)
+                            for i in range(slots)]
+
+    @property
+    def latest_seq(self):
+        return int(self._latest_seq[0])
+
+    def read(self, seq):
+        """Frame có số thứ tự seq, hoặc None nếu chưa ghi xong hoặc đã bị ghi đè"""
+        if seq <= 0:
+            return None
+        slot = (seq - 1) % self.slots
+        if int(self._slot_seq[slot]) != seq:
+            return None
+        view = FrameView(self, seq, slot, self._slot_frame[slot],
+                         self._slot_faces[slot][:int(self._slot_count[slot])],
+                         float(self._slot_time[slot]))
+        return view if view.is_valid() else None
+
+    def latest(self):
+        """Frame mới nhất đã ghi xong, hoặc None nếu bus còn trống"""
+        while True:
+            seq = self.latest_seq
+            if seq == 0:
+                return None
+            view = self.read(seq)
+            if view is not None:
+                return view
+            # writer vừa quay vòng qua slot này, đọc lại latest_seq
+
+    def wait_for(self, after_seq=0, timeout=None, poll_interval=0.002):
+        """Chờ frame có seq > after_seq; trả về frame mới nhất hoặc None khi hết timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self.latest_seq > after_seq:
+                view = self.latest()
+                if view is not None and view.seq > after_seq:
+                    return view
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(poll_interval)
+
+    def close(self):
+        """Bỏ map vùng nhớ; mọi FrameView đã lấy ra không còn dùng được"""
+        for attr in ('_latest_seq', '_slot_seq', '_slot_time', '_slot_count', '_slot_faces', '_slot_frame'):
+            self.__dict__.pop(attr, None)
+        try:
+            self.shm.close()
+        except BufferError:
+            print("⚠️ Frame bus: vẫn còn FrameView đang được giữ, chưa thể đóng vùng nhớ")
+
+
+class FrameBusWriter(_FrameBus):
+    """Process duy nhất ghi vào bus (Face Detection Server)"""
+
+    def __init__(self, name, shape, slots=8, max_faces=32):
+        height, width, channels = shape if len(shape) == 3 else (*shape, 1)
+        size = HEADER_SIZE + slots * _slot_stride(height, width, channels, max_faces)
+        self.name = name
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Vùng nhớ còn sót lại từ lần chạy trước bị dừng đột ngột
+            cu = _attach(name)
+            cu.close()
+            cu.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        self.shm.buf[:HEADER_SIZE] = bytes(HEADER_SIZE)
+        self._map(slots, height, width, channels, max_faces)
+        self._slot_seq[:] = 0
+        self._next_seq = 0
+        # Ghi magic sau cùng để reader không đọc header dở dang
+        _HEADER.pack_into(self.shm.buf, 0, MAGIC, VERSION, slots, height, width, channels, max_faces)
+
+    def begin_write(self, frame=None):
+        """
+        Giữ slot kế tiếp và trả về view frame của slot đó. Có thể truyền frame để copy vào,
+        hoặc ghi trực tiếp vào view (ví dụ camera.read(view)). Phải gọi commit() sau đó.
+        """
+        self._next_seq = self.latest_seq + 1
+        slot = (self._next_seq - 1) % self.slots
+        self._slot_seq[slot] = 0
+        view = self._slot_frame[slot]
+        if frame is not None:
+            if frame.size != view.size:
+                raise ValueError(f"Kích thước frame {frame.shape} khác với bus {view.shape}")
+            np.copyto(view, frame.reshape(view.shape))
+        return view
+
+    def commit(self, faces=(), timestamp=None):
+        """Ghi kết quả nhận diện (danh sách x, y, w, h) và công bố frame cho reader"""
+        seq = self._next_seq
+        slot = (seq - 1) % self.slots
+        count = min(len(faces), self.max_faces)
+        if count:
+            self._slot_faces[slot][:count] = np.asarray(faces, dtype=np.int32)[:count]
+        self._slot_count[slot] = count
+        self._slot_time[slot] = time.time() if timestamp is None else timestamp
+        self._slot_seq[slot] = seq
+        self._latest_seq[0] = seq
+        return seq
+
+    def publish(self, frame, faces=(), timestamp=None):
+        """Ghi một frame hoàn chỉnh (begin_write + commit)"""
+        self.begin_write(frame)
+        return self.commit(faces, timestamp)
+
+    def unlink(self):
+        """Đóng và xóa vùng nhớ (gọi khi server dừng hẳn)"""
+        self.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class FrameBusReader(_FrameBus):
+    """Đọc frame từ bus của một process khác trên cùng máy"""
+
+    def __init__(self, name, timeout=10.0):
+        """Chờ tối đa timeout giây cho tới khi writer tạo bus"""
+        self.name = name
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                self.shm = _attach(name)
+                magic, version, slots, height, width, channels, max_faces = _HEADER.unpack_from(self.shm.buf, 0)
+                if magic == MAGIC:
+                    break
+                self.shm.close()
+            except FileNotFoundError:
+                pass
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Không tìm thấy frame bus '{name}'")
+            time.sleep(0.1)
+
+        if version != VERSION:
+            self.shm.close()
+            raise ValueError(f"Frame bus '{name}' dùng version {version}, cần {VERSION}")
+        self._map(slots, height, width, channels, max_faces)
+        self.frames_read = 0
+        self.frames_dropped = 0
+
+    def frames(self, timeout=None):
+        """
+        Generator trả về các frame mới theo thứ tự; frame bị bỏ qua vì đọc chậm
+        được đếm vào frames_dropped. Dừng khi không có frame mới trong timeout giây.
+        """
+        last_seq = self.latest_seq
+        while True:
+            view = self.wait_for(last_seq, timeout=timeout)
+            if view is None:
+                return
+            if last_seq:
+                self.frames_dropped += view.seq - last_seq - 1
+            last_seq = view.seq
+            self.frames_read += 1
+            yield view
+
+
+def watch(name, duration=None):
+    """In tốc độ frame và số khuôn mặt đọc được từ bus"""
+    reader = FrameBusReader(name)
+    print(f"📡 Đã kết nối frame bus '{name}': {reader.slots} slot, frame {reader.shape}")
+    start = last_report = time.monotonic()
+    frames_since = 0
+    try:
+        for view in reader.frames(timeout=5.0):
+            frames_since += 1
+            now = time.monotonic()
+            if now - last_report >= 1.0:
+                lag_ms = (time.time() - view.timestamp) * 1000
+                print(f"seq={view.seq} fps={frames_since / (now - last_report):.1f} "
+                      f"faces={len(view.faces)} lag={lag_ms:.1f}ms dropped={reader.frames_dropped}")
+                frames_since = 0
+                last_report = now
+            del view
+            if duration and now - start >= duration:
+                break
+        else:
+            print("⏱️ Không có frame mới trong 5 giây")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Theo dõi frame bus của Face Detection Server")
+    parser.add_argument('--name', default='aivos_frames', help="Tên vùng shared memory (FRAME_BUS_NAME)")
+    parser.add_argument('--duration', type=float, help="Dừng sau số giây này")
+    args = parser.parse_args()
+    watch(args.name, args.duration)
+
+
+if __name__ == "__main__":
+    main()
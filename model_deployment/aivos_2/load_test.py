@@ -0,0 +1,429 @@
+"""
+Load test cho Face Detection Server và API /predict (docker_example/server.py).
+
+Các kịch bản chạy đồng thời trong một event loop:
+- N MJPEG viewer đọc /video_feed, mỗi viewer có thể đọc chậm (--viewer-fps) để giả lập client mạng yếu
+- M WebSocket subscriber nhận event face_detected
+- REST poller gọi /status và /events
+- worker gửi POST /predict tới FastAPI server
+
+Kết quả: throughput, độ trễ p50/p90/p99/max cho từng kịch bản và CPU/RAM/thread của process server.
+Với --spawn-server, harness tự chạy face_detection_server.py với CAMERA_SOURCE là một file video
+(tự tạo video mẫu nếu chưa có), nên toàn bộ chạy được trên máy local không cần camera.
+
+Ví dụ:
+    python load_test.py --spawn-server --video sample.avi --viewers 8 --viewer-fps 30 5 --subscribers 50 --duration 30
+    python load_test.py --server-url http://localhost:8080 --server-pid 1234 --json-out run.json --baseline base.json
+    python load_test.py --viewers 0 --subscribers 0 --pollers 0 --predict-url http://localhost:8888/predict
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import aiohttp
+import numpy as np
+import socketio
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+FRAME_MARKER = b'--frame\r\n'
+# Video mẫu do make_sample_video tạo khi --video chưa tồn tại
+SAMPLE_VIDEO = 'load_test_video.avi'
+
+
+class LatencyStats:
+    """Thống kê số request, lỗi và độ trễ của một kịch bản"""
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.errors = 0
+        self.bytes = 0
+
+    def record(self, seconds, nbytes=0):
+        self.latencies.append(seconds)
+        self.bytes += nbytes
+
+    def error(self):
+        self.errors += 1
+
+    def summary(self, duration):
+        result = {
+            'count': len(self.latencies),
+            'errors': self.errors,
+            'throughput': len(self.latencies) / duration if duration else 0.0,
+            'mb_per_s': self.bytes / duration / 1e6 if duration else 0.0,
+        }
+        if self.latencies:
+            p50, p90, p99 = np.percentile(self.latencies, [50, 90, 99]) * 1000
+            result.update(p50_ms=float(p50), p90_ms=float(p90), p99_ms=float(p99),
+                          max_ms=float(max(self.latencies) * 1000))
+        return result
+
+
+class ResourceMonitor:
+    """Lấy mẫu CPU, RAM, số thread của process server (và process con) bằng psutil"""
+
+    def __init__(self, pid, interval=0.5):
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.samples = []
+
+    def _processes(self):
+        try:
+            return [self.process] + self.process.children(recursive=True)
+        except psutil.Error:
+            return []
+
+    async def run(self, stop_at):
+        for p in self._processes():
+            p.cpu_percent(None)
+        while time.monotonic() < stop_at:
+            await asyncio.sleep(self.interval)
+            cpu = rss = threads = 0
+            for p in self._processes():
+                try:
+                    with p.oneshot():
+                        cpu += p.cpu_percent(None)
+                        rss += p.memory_info().rss
+                        threads += p.num_threads()
+                except psutil.Error:
+                    continue
+            self.samples.append((cpu, rss, threads))
+
+    def summary(self):
+        if not self.samples:
+            return {}
+        cpu, rss, threads = (np.array(column) for column in zip(*self.samples))
+        return {
+            'cpu_percent_avg': float(cpu.mean()),
+            'cpu_percent_max': float(cpu.max()),
+            'rss_mb_max': float(rss.max() / 1e6),
+            'threads_max': int(threads.max()),
+        }
+
+
+async def mjpeg_viewer(session, url, frame_stats, first_frame_stats, stop_at, fps=None):
+    """Đọc luồng MJPEG, đếm frame theo boundary; fps giới hạn tốc độ đọc của viewer"""
+    start = time.monotonic()
+    try:
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=None, sock_connect=10)) as resp:
+            if resp.status != 200:
+                first_frame_stats.error()
+                return
+            tail = b''
+            last_frame = None
+            async for chunk in resp.content.iter_chunked(64 * 1024):
+                now = time.monotonic()
+                buffer = tail + chunk
+                frames = buffer.count(FRAME_MARKER)
+                tail = buffer[-(len(FRAME_MARKER) - 1):]
+                frame_stats.bytes += len(chunk)
+                for _ in range(frames):
+                    if last_frame is None:
+                        first_frame_stats.record(now - start)
+                    else:
+                        frame_stats.record(now - last_frame)
+                    last_frame = now
+                if now >= stop_at:
+                    break
+                if fps and frames:
+                    # Đọc chậm: để dữ liệu dồn lại trong socket như một client mạng yếu
+                    await asyncio.sleep(frames / fps)
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        frame_stats.error()
+
+
+async def websocket_subscriber(url, connect_stats, event_stats, stop_at):
+    """Kết nối WebSocket và đo độ trễ từ timestamp của server tới lúc nhận event"""
+    sio = socketio.AsyncClient(reconnection=False)
+
+    @sio.event
+    async def face_detected(data):
+        try:
+            sent = datetime.fromisoformat(data['timestamp']).timestamp()
+            event_stats.record(max(time.time() - sent, 0.0))
+        except (KeyError, ValueError):
+            event_stats.error()
+
+    start = time.monotonic()
+    try:
+        await sio.connect(url, wait_timeout=10)
+        connect_stats.record(time.monotonic() - start)
+    except socketio.exceptions.ConnectionError:
+        connect_stats.error()
+        return
+    try:
+        await asyncio.sleep(max(stop_at - time.monotonic(), 0))
+    finally:
+        await sio.disconnect()
+
+
+async def rest_poller(session, base_url, stats_by_path, stop_at, interval):
+    """Gọi lần lượt các endpoint REST, mỗi vòng cách nhau interval giây"""
+    while time.monotonic() < stop_at:
+        for path, stats in stats_by_path.items():
+            start = time.monotonic()
+            try:
+                async with session.get(base_url + path) as resp:
+                    body = await resp.read()
+                    if resp.status == 200:
+                        stats.record(time.monotonic() - start, len(body))
+                    else:
+                        stats.error()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                stats.error()
+        await asyncio.sleep(interval)
+
+
+async def predict_worker(session, url, stats, stop_at, payload):
+    """Gửi POST /predict liên tục (closed loop)"""
+    while time.monotonic() < stop_at:
+        start = time.monotonic()
+        try:
+            async with session.post(url, json=payload) as resp:
+                await resp.read()
+                if resp.status == 200:
+                    stats.record(time.monotonic() - start)
+                else:
+                    stats.error()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            stats.error()
+
+
+def make_sample_video(path, seconds=10, fps=30, size=(640, 480)):
+    """Tạo video mẫu (hình chuyển động + nhiễu) để phát lại khi không có file ghi hình thật"""
+    import cv2
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, size)
+    rng = np.random.default_rng(0)
+    width, height = size
+    for i in range(seconds * fps):
+        frame = rng.integers(0, 40, (height, width, 3), dtype=np.uint8)
+        x = int((width - 120) * (0.5 + 0.5 * np.sin(i / fps)))
+        cv2.circle(frame, (x + 60, height // 2), 60, (200, 180, 160), -1)
+        cv2.putText(frame, f"frame {i}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+        writer.write(frame)
+    writer.release()
+    print(f"🎞️ Đã tạo video mẫu: {path} ({seconds}s, {fps} fps)")
+
+
+async def wait_for_server(session, base_url, timeout):
+    """Chờ /status trả về 200; trả về số giây đã chờ hoặc None"""
+    start = time.monotonic()
+    while time.monotonic() - start < timeout:
+        try:
+            async with session.get(base_url + '/status') as resp:
+                if resp.status == 200:
+                    return time.monotonic() - start
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.05)
+    return None
+
+
+def spawn_server(args):
+    """Chạy face_detection_server.py phát lại file video"""
+    sample = args.video == SAMPLE_VIDEO
+    if not os.path.exists(args.video):
+        make_sample_video(args.video)
+        sample = True
+    synthetic_face_every = args.synthetic_face_every
+    if synthetic_face_every is None:
+        # Video mẫu không có mặt người: báo khuôn mặt giả để có event; video thật thì chỉ dùng Haar cascade
+        synthetic_face_every = 10 if sample else 0
+    env = dict(os.environ, SERVER_PORT=str(args.port), CAMERA_SOURCE=os.path.abspath(args.video),
+               SYNTHETIC_FACE_EVERY=str(synthetic_face_every), PYTHONUNBUFFERED='1')
+    if args.frame_bus:
+        env['FRAME_BUS_NAME'] = args.frame_bus
+    server_dir = os.path.dirname(os.path.abspath(__file__))
+    log = open(args.server_log, 'w')
+    process = subprocess.Popen([sys.executable, 'face_detection_server.py'], cwd=server_dir,
+                               env=env, stdout=log, stderr=subprocess.STDOUT)
+    print(f"🚀 Đã chạy server (pid {process.pid}), log: {args.server_log}")
+    return process, log
+
+
+async def run_load_test(args):
+    viewer_speeds = args.viewer_fps or [0]
+    connector = aiohttp.TCPConnector(limit=0)
+    results = {}
+    resources = {}
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=30)) as session:
+        if args.server_needed:
+            waited = await wait_for_server(session, args.server_url, args.startup_timeout)
+            if waited is None:
+                raise RuntimeError(f"Server {args.server_url} không phản hồi sau {args.startup_timeout}s")
+            results['server_ready'] = {'waited_s': waited}
+            if args.start_camera:
+                async with session.post(args.server_url + '/start') as resp:
+                    body = await resp.json()
+                    print(f"📹 /start: {body.get('message')}")
+                    if resp.status != 200:
+                        raise RuntimeError("Server không khởi động được camera/video")
+
+        stats = {name: LatencyStats(name) for name in
+                 ['mjpeg_first_frame', 'mjpeg_frame_gap', 'ws_connect', 'ws_event',
+                  'rest_status', 'rest_events', 'predict']}
+        start = time.monotonic()
+        stop_at = start + args.duration
+        tasks = []
+
+        for i in range(args.viewers):
+            tasks.append(mjpeg_viewer(session, args.server_url + '/video_feed', stats['mjpeg_frame_gap'],
+                                      stats['mjpeg_first_frame'], stop_at,
+                                      viewer_speeds[i % len(viewer_speeds)] or None))
+        for _ in range(args.subscribers):
+            tasks.append(websocket_subscriber(args.server_url, stats['ws_connect'], stats['ws_event'], stop_at))
+        for _ in range(args.pollers):
+            tasks.append(rest_poller(session, args.server_url,
+                                     {'/status': stats['rest_status'], '/events': stats['rest_events']},
+                                     stop_at, args.poll_interval))
+        if args.predict_url:
+            payload = {'features': args.predict_features}
+            for _ in range(args.predict_workers):
+                tasks.append(predict_worker(session, args.predict_url, stats['predict'], stop_at, payload))
+
+        monitor = None
+        if args.server_pid:
+            if psutil is None:
+                print("⚠️ Chưa cài psutil, bỏ qua đo tài nguyên server")
+            else:
+                monitor = ResourceMonitor(args.server_pid)
+                tasks.append(monitor.run(stop_at))
+
+        print(f"⏱️ Chạy {len(tasks)} tác vụ trong {args.duration}s...")
+        # Viewer MJPEG có thể bị chặn khi server ngừng gửi frame; cắt sau duration + 5s
+        await asyncio.wait([asyncio.ensure_future(t) for t in tasks], timeout=args.duration + 5)
+        elapsed = time.monotonic() - start
+
+        for name, s in stats.items():
+            if s.latencies or s.errors:
+                results[name] = s.summary(elapsed)
+        if monitor:
+            resources = monitor.summary()
+
+    return results, resources
+
+
+def print_report(results, resources, subscribers=0):
+    print("\n" + "=" * 96)
+    print(f"{'Kịch bản':<20}{'Số lượng':>10}{'Lỗi':>7}{'Thông lượng/s':>15}{'MB/s':>8}"
+          f"{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    print("-" * 96)
+    for name, r in results.items():
+        if 'count' not in r:
+            continue
+        print(f"{name:<20}{r['count']:>10}{r['errors']:>7}{r['throughput']:>15.1f}{r['mb_per_s']:>8.2f}"
+              f"{r.get('p50_ms', float('nan')):>9.1f}{r.get('p90_ms', float('nan')):>9.1f}"
+              f"{r.get('p99_ms', float('nan')):>9.1f}{r.get('max_ms', float('nan')):>9.1f}")
+    print("=" * 96)
+    if subscribers and 'ws_event' not in results:
+        print(f"⚠️ {subscribers} WebSocket subscriber không nhận được event face_detected nào: "
+              f"độ trễ event chưa được đo (video không có khuôn mặt? thử --synthetic-face-every)")
+    if 'server_ready' in results:
+        print(f"Server sẵn sàng sau {results['server_ready']['waited_s'] * 1000:.0f} ms")
+    if resources:
+        print(f"Server: CPU trung bình {resources['cpu_percent_avg']:.0f}% (max {resources['cpu_percent_max']:.0f}%), "
+              f"RAM max {resources['rss_mb_max']:.0f} MB, thread max {resources['threads_max']}")
+
+
+def compare_with_baseline(results, baseline_path, max_regression):
+    """So sánh p99 và thông lượng với lần chạy trước; trả về danh sách các chỉ số bị chậm đi"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+
+    regressions = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if not base or 'count' not in r:
+            continue
+        if base.get('p99_ms') and r.get('p99_ms') and r['p99_ms'] > base['p99_ms'] * (1 + max_regression):
+            regressions.append(f"{name}: p99 {base['p99_ms']:.1f} -> {r['p99_ms']:.1f} ms")
+        if base.get('throughput') and r['throughput'] < base['throughput'] * (1 - max_regression):
+            regressions.append(f"{name}: thông lượng {base['throughput']:.1f} -> {r['throughput']:.1f}/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test Face Detection Server và API /predict")
+    parser.add_argument('--server-url', default=None, help="URL face server (mặc định http://localhost:<port>)")
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--viewers', type=int, default=4, help="Số MJPEG viewer")
+    parser.add_argument('--viewer-fps', type=float, nargs='*',
+                        help="Tốc độ đọc của viewer (frame/s), gán xoay vòng; 0 = không giới hạn")
+    parser.add_argument('--subscribers', type=int, default=10, help="Số WebSocket subscriber")
+    parser.add_argument('--pollers', type=int, default=4, help="Số REST poller (/status và /events)")
+    parser.add_argument('--poll-interval', type=float, default=0.2)
+    parser.add_argument('--predict-url', help="Ví dụ http://localhost:8888/predict")
+    parser.add_argument('--predict-workers', type=int, default=8)
+    parser.add_argument('--predict-features', type=float, nargs='+', default=[5.1, 3.5, 1.4, 0.2])
+    parser.add_argument('--duration', type=float, default=30, help="Thời gian chạy (giây)")
+    parser.add_argument('--server-pid', type=int, help="PID server để đo CPU/RAM")
+    parser.add_argument('--spawn-server', action='store_true', help="Tự chạy face server phát lại --video")
+    parser.add_argument('--video', default=SAMPLE_VIDEO, help="File video để phát lại")
+    parser.add_argument('--frame-bus', help="Bật FRAME_BUS_NAME cho server được spawn")
+    parser.add_argument('--synthetic-face-every', type=int,
+                        help="Server được spawn báo một khuôn mặt giả mỗi N frame để có event WebSocket; "
+                             "0 = chỉ dùng Haar cascade. Mặc định 10 với video mẫu (không có mặt người), "
+                             "0 với video khác")
+    parser.add_argument('--server-log', default='load_test_server.log')
+    parser.add_argument('--no-start', dest='start_camera', action='store_false',
+                        help="Không gọi POST /start trước khi chạy")
+    parser.add_argument('--startup-timeout', type=float, default=15)
+    parser.add_argument('--json-out', help="Lưu kết quả JSON để làm baseline")
+    parser.add_argument('--baseline', help="File JSON của lần chạy trước để so sánh")
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help="Ngưỡng chậm đi cho phép so với baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    args.server_url = (args.server_url or f"http://localhost:{args.port}").rstrip('/')
+    args.server_needed = bool(args.viewers or args.subscribers or args.pollers)
+    if not args.server_needed:
+        args.start_camera = False
+
+    process = log = None
+    if args.spawn_server:
+        process, log = spawn_server(args)
+        args.server_pid = args.server_pid or process.pid
+
+    try:
+        results, resources = asyncio.run(run_load_test(args))
+    finally:
+        if process:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            log.close()
+
+    print_report(results, resources, args.subscribers)
+
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump({'timestamp': datetime.now().isoformat(), 'config': {
+                k: v for k, v in vars(args).items() if k not in ('baseline', 'json_out')},
+                'results': results, 'resources': resources}, f, ensure_ascii=False, indent=2)
+        print(f"💾 Đã lưu kết quả: {args.json_out}")
+
+    if args.baseline:
+        regressions = compare_with_baseline(results, args.baseline, args.max_regression)
+        if regressions:
+            print("❌ Chậm hơn baseline:")
+            for line in regressions:
+                print(f"   - {line}")
+            sys.exit(1)
+        print("✅ Không có chỉ số nào chậm hơn baseline")
+
+
+if __name__ == "__main__":
+    main()
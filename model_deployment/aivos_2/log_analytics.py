@@ -0,0 +1,409 @@
+import argparse
+import glob
+import hashlib
+import io
+import json
+import os
+import sys
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.json as pa_json
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+US_PER_MINUTE = 60 * 1_000_000
+LAG_BIN_MS = 1          # độ rộng bin histogram độ trễ (ms)
+LAG_MAX_MS = 60_000     # độ trễ lớn hơn giá trị này được gộp vào bin cuối
+DWELL_BIN_S = 1         # độ rộng bin histogram thời gian dừng (giây)
+DWELL_MAX_S = 3600
+
+COLUMNS = ['timestamp', 'server_timestamp', 'faces_count', 'source']
+
+
+def segment_fingerprint(path, size=1024):
+    """Định danh một đoạn log bằng hash dòng đầu tiên (tối đa size byte).
+
+    Phần này không đổi khi file được ghi thêm hay bị đổi tên lúc rotate. Trả về None
+    nếu file chưa có dòng hoàn chỉnh nào.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(size)
+    cut = head.find(b'\n') + 1
+    if cut == 0:
+        if len(head) < size:
+            return None
+        cut = size  # dòng đầu dài hơn size byte: size byte đầu cũng không đổi nữa
+    return hashlib.sha1(head[:cut]).hexdigest()
+
+
+def iter_blocks(path, offset=0, chunk_size=64 * 1024 * 1024):
+    """Đọc file theo từng khối chứa các dòng hoàn chỉnh.
+
+    Trả về (block, end_offset); end_offset là vị trí ngay sau dòng cuối cùng của block,
+    dòng chưa ghi xong ở cuối file được để lại cho lần đọc sau.
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        remainder = b''
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            data = remainder + data
+            cut = data.rfind(b'\n') + 1
+            if cut == 0:
+                remainder = data
+                continue
+            offset += cut
+            remainder = data[cut:]
+            yield data[:cut], offset
+
+
+def parse_block(block):
+    """Chuyển một khối JSONL thành các cột NumPy: timestamp/server_timestamp (int64 µs), faces_count, source"""
+    if pa is not None:
+        try:
+            return _parse_block_arrow(block)
+        except pa.ArrowInvalid:
+            pass  # có dòng hỏng, dùng cách đọc từng dòng bên dưới
+    return _parse_block_json(block)
+
+
+def _parse_block_arrow(block):
+    schema = pa.schema([('timestamp', pa.string()), ('server_timestamp', pa.string()),
+                        ('faces_count', pa.int64()), ('source', pa.string())])
+    table = pa_json.read_json(
+        io.BytesIO(block),
+        read_options=pa_json.ReadOptions(block_size=max(len(block), 1 << 20)),
+        parse_options=pa_json.ParseOptions(explicit_schema=schema, unexpected_field_behavior='ignore'))
+    columns = {}
+    for name in ('timestamp', 'server_timestamp'):
+        ts = pc.cast(table[name], pa.timestamp('us'))
+        columns[name] = ts.to_numpy(zero_copy_only=False).astype('datetime64[us]').astype(np.int64)
+    columns['faces_count'] = table['faces_count'].fill_null(0).to_numpy().astype(np.int32)
+    source = table['source']
+    columns['source'] = None if source.null_count == len(source) else \
+        source.fill_null('').to_numpy(zero_copy_only=False)
+    return columns
+
+
+def _parse_block_json(block):
+    timestamps, server_timestamps, faces_count, sources = [], [], [], []
+    for line in block.splitlines():
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        timestamps.append(entry.get('timestamp'))
+        server_timestamps.append(entry.get('server_timestamp'))
+        faces_count.append(entry.get('faces_count') or 0)
+        sources.append(entry.get('source') or '')
+    return {
+        'timestamp': np.array(timestamps, dtype='datetime64[us]').astype(np.int64),
+        'server_timestamp': np.array(server_timestamps, dtype='datetime64[us]').astype(np.int64),
+        'faces_count': np.array(faces_count, dtype=np.int32),
+        'source': np.array(sources, dtype=object) if any(sources) else None,
+    }
+
+
+class LogAnalyzer:
+    """Thống kê lịch sử event face_detected từ log JSONL của client.
+
+    Log được đọc theo khối với bộ nhớ giới hạn; các chỉ số được cộng dồn vào một
+    trạng thái nhỏ (số event/phút, histogram độ trễ, histogram thời gian dừng) có thể
+    lưu ra file để lần chạy sau chỉ xử lý phần log mới.
+    """
+
+    NAT = np.iinfo(np.int64).min
+
+    def __init__(self, dwell_gap=2.0, chunk_size=64 * 1024 * 1024):
+        # dwell_gap: hai event cách nhau quá dwell_gap giây được xem là hai lần xuất hiện khác nhau
+        self.dwell_gap_us = int(dwell_gap * 1_000_000)
+        self.chunk_size = chunk_size
+        self.reset()
+
+    def reset(self):
+        self.segments = {}
+        self.per_minute = {}
+        self.lag_hist = np.zeros(LAG_MAX_MS // LAG_BIN_MS + 1, dtype=np.int64)
+        self.lag_sum = 0.0
+        self.lag_min = None
+        self.lag_max = None
+        self.dwell_hist = np.zeros(DWELL_MAX_S // DWELL_BIN_S + 1, dtype=np.int64)
+        self.dwell_count = 0
+        self.dwell_total = 0.0
+        self.dwell_max = 0.0
+        self.open_sessions = {}  # source -> [start_us, last_us]
+        self.total_events = 0
+        self.total_faces = 0
+
+    # ------------------------------------------------------------------
+    # Trạng thái
+    # ------------------------------------------------------------------
+    def load_state(self, path):
+        """Nạp trạng thái từ lần chạy trước (nếu có)"""
+        if not path or not os.path.exists(path):
+            return False
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        self.segments = state['segments']
+        self.per_minute = {int(k): v for k, v in state['per_minute'].items()}
+        self.lag_hist = np.array(state['lag_hist'], dtype=np.int64)
+        self.lag_sum = state['lag_sum']
+        self.lag_min = state['lag_min']
+        self.lag_max = state['lag_max']
+        self.dwell_hist = np.array(state['dwell_hist'], dtype=np.int64)
+        self.dwell_count = state['dwell_count']
+        self.dwell_total = state['dwell_total']
+        self.dwell_max = state['dwell_max']
+        self.open_sessions = state['open_sessions']
+        self.total_events = state['total_events']
+        self.total_faces = state['total_faces']
+        return True
+
+    def save_state(self, path):
+        """Lưu trạng thái để lần chạy sau xử lý tiếp"""
+        state = {
+            'segments': self.segments,
+            'per_minute': {str(k): v for k, v in self.per_minute.items()},
+            'lag_hist': self.lag_hist.tolist(),
+            'lag_sum': self.lag_sum,
+            'lag_min': self.lag_min,
+            'lag_max': self.lag_max,
+            'dwell_hist': self.dwell_hist.tolist(),
+            'dwell_count': self.dwell_count,
+            'dwell_total': self.dwell_total,
+            'dwell_max': self.dwell_max,
+            'open_sessions': self.open_sessions,
+            'total_events': self.total_events,
+            'total_faces': self.total_faces,
+        }
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    # ------------------------------------------------------------------
+    # Xử lý log
+    # ------------------------------------------------------------------
+    def process_files(self, paths, export_dir=None, export_format='parquet'):
+        """Xử lý các đoạn log theo thứ tự cũ -> mới, bỏ qua phần đã xử lý ở lần chạy trước"""
+        paths = sorted(set(paths), key=lambda p: (os.path.getmtime(p), p))
+        processed = 0
+        for path in paths:
+            if os.path.getsize(path) == 0:
+                continue
+            key = segment_fingerprint(path)
+            if key is None:
+                continue
+            segment = self.segments.get(key, {'offset': 0})
+            if os.path.getsize(path) < segment['offset']:
+                segment = {'offset': 0}  # file bị ghi đè
+            for block, end_offset in iter_blocks(path, segment['offset'], self.chunk_size):
+                columns = parse_block(block)
+                self.update(columns)
+                if export_dir:
+                    export_columns(columns, export_dir, key, segment['offset'], export_format)
+                segment['offset'] = end_offset
+                processed += len(block)
+            segment['path'] = path
+            self.segments[key] = segment
+        return processed
+
+    def update(self, columns):
+        """Cộng dồn các chỉ số của một khối event"""
+        ts = columns['timestamp']
+        valid = ts != self.NAT
+        if not valid.all():
+            columns = {k: (v[valid] if v is not None else None) for k, v in columns.items()}
+            ts = columns['timestamp']
+        if len(ts) == 0:
+            return
+        faces = columns['faces_count']
+        self.total_events += len(ts)
+        self.total_faces += int(faces.sum())
+
+        self._update_per_minute(ts, faces)
+        self._update_lag(ts, columns['server_timestamp'])
+
+        source = columns['source']
+        if source is None:
+            self._update_dwell('', ts)
+        else:
+            names, inverse = np.unique(source, return_inverse=True)
+            for i, name in enumerate(names):
+                self._update_dwell(str(name), ts[inverse == i])
+
+    def _update_per_minute(self, ts, faces):
+        minutes, inverse = np.unique(ts // US_PER_MINUTE, return_inverse=True)
+        events = np.bincount(inverse, minlength=len(minutes))
+        face_sums = np.bincount(inverse, weights=faces, minlength=len(minutes))
+        for minute, n_events, n_faces in zip(minutes.tolist(), events.tolist(), face_sums.tolist()):
+            current = self.per_minute.setdefault(minute, [0, 0])
+            current[0] += n_events
+            current[1] += int(n_faces)
+
+    def _update_lag(self, ts, server_ts):
+        mask = server_ts != self.NAT
+        if not mask.any():
+            return
+        lag_ms = (ts[mask] - server_ts[mask]) / 1000.0
+        bins = np.clip((lag_ms // LAG_BIN_MS).astype(np.int64), 0, len(self.lag_hist) - 1)
+        self.lag_hist += np.bincount(bins, minlength=len(self.lag_hist))
+        self.lag_sum += float(lag_ms.sum())
+        lag_min, lag_max = float(lag_ms.min()), float(lag_ms.max())
+        self.lag_min = lag_min if self.lag_min is None else min(self.lag_min, lag_min)
+        self.lag_max = lag_max if self.lag_max is None else max(self.lag_max, lag_max)
+
+    def _update_dwell(self, source, ts):
+        """Gom các event liên tiếp (khoảng cách <= dwell_gap) thành một lần xuất hiện"""
+        ts = np.sort(ts, kind='stable')
+        open_session = self.open_sessions.get(source)
+        if open_session is not None and ts[0] - open_session[1] > self.dwell_gap_us:
+            self._close_sessions(np.array([open_session[1] - open_session[0]]))
+            open_session = None
+
+        breaks = np.flatnonzero(np.diff(ts) > self.dwell_gap_us)
+        starts = np.concatenate(([0], breaks + 1))
+        ends = np.concatenate((breaks, [len(ts) - 1]))
+        start_times = ts[starts]
+        if open_session is not None:
+            start_times[0] = open_session[0]
+        durations = ts[ends] - start_times
+
+        # Lần xuất hiện cuối có thể còn tiếp tục ở khối sau
+        self._close_sessions(durations[:-1])
+        self.open_sessions[source] = [int(start_times[-1]), int(ts[-1])]
+
+    def _close_sessions(self, durations_us):
+        if len(durations_us) == 0:
+            return
+        durations = durations_us / 1_000_000
+        bins = np.clip((durations // DWELL_BIN_S).astype(np.int64), 0, len(self.dwell_hist) - 1)
+        self.dwell_hist += np.bincount(bins, minlength=len(self.dwell_hist))
+        self.dwell_count += len(durations)
+        self.dwell_total += float(durations.sum())
+        self.dwell_max = max(self.dwell_max, float(durations.max()))
+
+    # ------------------------------------------------------------------
+    # Báo cáo
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _hist_percentiles(hist, bin_width, percentiles):
+        total = hist.sum()
+        if total == 0:
+            return {f'p{p}': None for p in percentiles}
+        cumulative = np.cumsum(hist)
+        idx = np.searchsorted(cumulative, np.array(percentiles) / 100.0 * total)
+        return {f'p{p}': float((i + 1) * bin_width) for p, i in zip(percentiles, idx)}
+
+    def report(self, include_open=True):
+        """Tổng hợp kết quả thống kê"""
+        dwell_hist = self.dwell_hist.copy()
+        dwell_count, dwell_total, dwell_max = self.dwell_count, self.dwell_total, self.dwell_max
+        if include_open:
+            for start, last in self.open_sessions.values():
+                duration = (last - start) / 1_000_000
+                dwell_hist[min(int(duration // DWELL_BIN_S), len(dwell_hist) - 1)] += 1
+                dwell_count += 1
+                dwell_total += duration
+                dwell_max = max(dwell_max, duration)
+
+        minutes = sorted(self.per_minute)
+        per_minute = [{'minute': str(np.datetime64(m * US_PER_MINUTE, 'us').astype('datetime64[m]')),
+                       'events': self.per_minute[m][0],
+                       'faces': self.per_minute[m][1]} for m in minutes]
+        face_counts = np.array([row['faces'] for row in per_minute]) if per_minute else np.zeros(0)
+        lag_count = int(self.lag_hist.sum())
+
+        return {
+            'total_events': self.total_events,
+            'total_faces': self.total_faces,
+            'faces_per_minute': {
+                'mean': float(face_counts.mean()) if len(face_counts) else 0.0,
+                'max': int(face_counts.max()) if len(face_counts) else 0,
+                'minutes': per_minute,
+            },
+            'dwell_time_s': {
+                'count': dwell_count,
+                'mean': dwell_total / dwell_count if dwell_count else None,
+                'max': dwell_max if dwell_count else None,
+                **self._hist_percentiles(dwell_hist, DWELL_BIN_S, [50, 90, 99]),
+            },
+            'delivery_lag_ms': {
+                'count': lag_count,
+                'mean': self.lag_sum / lag_count if lag_count else None,
+                'min': self.lag_min,
+                'max': self.lag_max,
+                **self._hist_percentiles(self.lag_hist, LAG_BIN_MS, [50, 90, 99]),
+            },
+        }
+
+
+def export_columns(columns, export_dir, segment_key, offset, export_format='parquet'):
+    """Ghi một khối event ra định dạng cột (Parquet hoặc .npz), mỗi khối một file"""
+    os.makedirs(export_dir, exist_ok=True)
+    base = os.path.join(export_dir, f'{segment_key[:12]}_{offset:012d}')
+    data = {
+        'timestamp': columns['timestamp'].astype('datetime64[us]'),
+        'server_timestamp': columns['server_timestamp'].astype('datetime64[us]'),
+        'faces_count': columns['faces_count'],
+    }
+    if columns['source'] is not None:
+        data['source'] = columns['source']
+
+    if export_format == 'parquet':
+        if pa is None:
+            raise RuntimeError("Cần cài pyarrow để xuất Parquet")
+        table = pa.table({name: pa.array(values) for name, values in data.items()})
+        pq.write_table(table, base + '.parquet')
+    else:
+        if 'source' in data:
+            data['source'] = data['source'].astype(str)
+        np.savez(base + '.npz', **data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Thống kê log face_detection_log.json")
+    parser.add_argument('logs', nargs='*', default=['face_detection_log.json*'],
+                        help="File log hoặc glob, gồm cả các đoạn đã rotate (mặc định: face_detection_log.json*)")
+    parser.add_argument('--state', help="File trạng thái để xử lý tăng dần giữa các lần chạy")
+    parser.add_argument('--export-dir', help="Thư mục xuất dữ liệu dạng cột")
+    parser.add_argument('--export-format', choices=['parquet', 'npz'], default='parquet')
+    parser.add_argument('--dwell-gap', type=float, default=2.0,
+                        help="Khoảng cách tối đa (giây) giữa hai event trong cùng một lần xuất hiện")
+    parser.add_argument('--chunk-mb', type=int, default=64, help="Kích thước khối đọc (MB)")
+    parser.add_argument('--per-minute', action='store_true', help="In chi tiết số khuôn mặt theo từng phút")
+    args = parser.parse_args()
+
+    paths = sorted({p for pattern in args.logs for p in glob.glob(pattern)
+                    if os.path.isfile(p) and not p.endswith(('.tmp', '.state'))})
+    if not paths:
+        print("❌ Không tìm thấy file log")
+        sys.exit(1)
+
+    analyzer = LogAnalyzer(dwell_gap=args.dwell_gap, chunk_size=args.chunk_mb * 1024 * 1024)
+    if analyzer.load_state(args.state):
+        print(f"📂 Đã nạp trạng thái từ {args.state}")
+
+    processed = analyzer.process_files(paths, args.export_dir, args.export_format)
+    print(f"📝 Đã xử lý {processed / 1024 / 1024:.1f} MB từ {len(paths)} file")
+
+    if args.state:
+        analyzer.save_state(args.state)
+
+    report = analyzer.report()
+    if not args.per_minute:
+        report['faces_per_minute'].pop('minutes')
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI, HTTPException
+
+# Mô hình tạo bởi: python Module_2/customer_segmentation.py <input.csv> --model-out segment_model.npz
+MODEL_PATH = os.environ.get("SEGMENT_MODEL_PATH", "segment_model.npz")
+CSV_PATH = os.environ.get("SEGMENT_CSV_PATH", "ket_qua_phan_doan_khach_hang.csv")
+CACHE_DIR = os.environ.get("SEGMENT_CACHE_DIR", "segment_cache")
+
+
+class SegmentAssigner:
+    """Gán cụm cho khách hàng mới theo tâm gần nhất, xử lý cả lô bằng một phép nhân ma trận"""
+
+    def __init__(self, model_path):
+        with np.load(model_path) as model:
+            self.features = [str(f) for f in model["features"]]
+            self.mean = model["mean"]
+            self.scale = model["scale"]
+            self.centers = model["tam"]
+            self.center_labels = model["nhan_tam"]
+            self.cluster_names = [str(name) for name in model["ten_cum"]]
+        # ||c||² tính trước; ||x||² không ảnh hưởng argmin nên bỏ qua
+        self.center_norms = (self.centers ** 2).sum(axis=1)
+
+    def assign(self, X):
+        Z = (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+        distances = self.center_norms - 2.0 * Z @ self.centers.T
+        return self.center_labels[distances.argmin(axis=1)]
+
+
+class CustomerIndex:
+    """Tra cứu kết quả phân đoạn theo khach_hang_id.
+
+    CSV được đọc một lần và lưu lại dạng cột (.npy) sắp xếp theo id; các lần khởi động
+    sau mở các file này bằng memmap. Tra cứu dùng np.searchsorted nên một lô id chỉ
+    cần một lời gọi.
+    """
+
+    COLUMNS = ["recency", "frequency", "monetary"]
+
+    def __init__(self, csv_path, cache_dir):
+        self.csv_path = csv_path
+        self.cache_dir = cache_dir
+        if not self._cache_is_fresh():
+            self._build_cache()
+        self._load_cache()
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, f"{name}.npy")
+
+    def _source_info(self):
+        stat = os.stat(self.csv_path)
+        return {"path": os.path.abspath(self.csv_path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+    def _cache_is_fresh(self):
+        """Cache chỉ dùng được nếu được tạo từ đúng file CSV này (đường dẫn, kích thước, mtime)"""
+        try:
+            with open(os.path.join(self.cache_dir, "cluster_names.json"), encoding="utf-8") as f:
+                return json.load(f).get("source") == self._source_info()
+        except (OSError, ValueError, AttributeError):
+            return False
+
+    def _build_cache(self):
+        df = pd.read_csv(self.csv_path, usecols=["khach_hang_id", *self.COLUMNS, "cum_du_doan", "ten_cum"])
+        df = df.sort_values("khach_hang_id", kind="stable")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        np.save(self._path("khach_hang_id"), df["khach_hang_id"].to_numpy(dtype=np.int64))
+        for column in self.COLUMNS:
+            np.save(self._path(column), df[column].to_numpy(dtype=np.float64))
+        np.save(self._path("cum_du_doan"), df["cum_du_doan"].to_numpy(dtype=np.int32))
+        names = df.groupby("cum_du_doan")["ten_cum"].first()
+        # Ghi file tên cụm sau cùng: sự tồn tại của nó đánh dấu cache đã hoàn chỉnh
+        with open(os.path.join(self.cache_dir, "cluster_names.json"), "w", encoding="utf-8") as f:
+            json.dump({"source": self._source_info(),
+                       "cluster_names": {str(k): v for k, v in names.items()}}, f, ensure_ascii=False)
+
+    def _load_cache(self):
+        self.ids = np.load(self._path("khach_hang_id"), mmap_mode="r")
+        self.columns = {column: np.load(self._path(column), mmap_mode="r") for column in self.COLUMNS}
+        self.clusters = np.load(self._path("cum_du_doan"), mmap_mode="r")
+        with open(os.path.join(self.cache_dir, "cluster_names.json"), encoding="utf-8") as f:
+            self.cluster_names = {int(k): v for k, v in json.load(f)["cluster_names"].items()}
+
+    def lookup(self, ids):
+        """Trả về vị trí của từng id trong index, -1 nếu không tồn tại"""
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(self.ids) == 0:
+            return np.full(ids.shape, -1, dtype=np.int64)
+        positions = np.searchsorted(self.ids, ids)
+        positions[positions == len(self.ids)] = 0
+        found = self.ids[positions] == ids
+        return np.where(found, positions, -1)
+
+    def record(self, position):
+        cluster = int(self.clusters[position])
+        return {
+            "khach_hang_id": int(self.ids[position]),
+            **{column: float(values[position]) for column, values in self.columns.items()},
+            "cum_du_doan": cluster,
+            "ten_cum": self.cluster_names.get(cluster),
+        }
+
+
+assigner = SegmentAssigner(MODEL_PATH)
+index = CustomerIndex(CSV_PATH, CACHE_DIR)
+
+app = FastAPI()
+
+@app.get("/")
+def read_root():
+    return {"message": "Customer segment assignment",
+            "features": assigner.features,
+            "customers": len(index.ids)}
+
+@app.post("/assign")
+def assign(data: dict):
+    """Gán cụm cho một lô khách hàng: {"customers": [[r, f, m], ...]} hoặc [{"recency": ..., ...}, ...]"""
+    customers = data["customers"]
+    customers = [[c[f] for f in assigner.features] if isinstance(c, dict) else c for c in customers]
+    labels = assigner.assign(customers).tolist() if customers else []
+    return {"segments": [{"cum_du_doan": label, "ten_cum": assigner.cluster_names[label]}
+                         for label in labels]}
+
+@app.get("/customers/{khach_hang_id}")
+def get_customer(khach_hang_id: int):
+    position = int(index.lookup([khach_hang_id])[0])
+    if position < 0:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    return index.record(position)
+
+@app.post("/customers/lookup")
+def lookup_customers(data: dict):
+    """Tra cứu một lô khách hàng: {"ids": [1, 2, 3]}"""
+    positions = index.lookup(data["ids"]).tolist() if data["ids"] else []
+    return {"customers": [index.record(p) if p >= 0 else None for p in positions]}